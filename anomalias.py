@@ -0,0 +1,100 @@
+import warnings
+import pandas as pd
+import numpy as np
+from utils.cache import cache_gerenciado
+
+# Limiar clássico de Iglewicz & Hoaglin para o z-score modificado
+LIMIAR_PADRAO = 3.5
+
+# Fatores de consistência para estimar o desvio padrão de uma normal
+FATOR_MAD = 0.6745
+FATOR_DESVIO_MEDIO = 1.253314
+
+
+def componente_sazonal(valores, sazonalidade):
+    """Mediana por posição sazonal (ex.: mês do ano) de cada linha da matriz"""
+    sazonalidade = np.asarray(sazonalidade)
+    sazonal = np.zeros_like(valores)
+
+    # O laço é sobre as posições sazonais (no máximo 12), nunca sobre as linhas
+    for posicao in np.unique(sazonalidade):
+        colunas = sazonalidade == posicao
+        sazonal[:, colunas] = np.nanmedian(valores[:, colunas], axis=1, keepdims=True)
+
+    return np.nan_to_num(sazonal)
+
+
+def escala_robusta(valores):
+    """Estimativa robusta do desvio padrão de cada linha (MAD, ou desvio médio se o MAD for zero)"""
+    mediana = np.nanmedian(valores, axis=1, keepdims=True)
+    desvios = np.abs(valores - mediana)
+    mad = np.nanmedian(desvios, axis=1, keepdims=True)
+    desvio_medio = np.nanmean(desvios, axis=1, keepdims=True)
+
+    # Quando mais da metade dos valores é igual (MAD zero), usa o desvio médio absoluto
+    escala = np.where(mad > 0, mad / FATOR_MAD, desvio_medio * FATOR_DESVIO_MEDIO)
+    return np.nan_to_num(escala)
+
+
+def escores_robustos(matriz, sazonalidade=None):
+    """Calcula o z-score robusto (mediana/MAD) de cada célula categoria × período
+
+    Se `sazonalidade` indicar a posição de cada coluna (consecutiva) no ciclo,
+    como o mês do ano, e houver mais de um ciclo, a mediana sazonal é removida
+    antes da pontuação e a escala passa a vir das diferenças ano contra ano.
+    """
+    valores = np.asarray(matriz, dtype=float)
+
+    with warnings.catch_warnings():
+        # Linhas totalmente vazias geram avisos de "All-NaN slice"
+        warnings.simplefilter('ignore', RuntimeWarning)
+
+        ciclo = len(np.unique(sazonalidade)) if sazonalidade is not None else 0
+        if ciclo and valores.shape[1] > ciclo:
+            residuos = valores - componente_sazonal(valores, sazonalidade)
+            # Os resíduos em torno de medianas de poucos anos subestimam a dispersão;
+            # a diferença entre anos consecutivos tem variância 2σ² e não sofre desse viés
+            escala = escala_robusta(valores[:, ciclo:] - valores[:, :-ciclo]) / np.sqrt(2)
+        else:
+            residuos = valores
+            escala = escala_robusta(valores)
+
+        centro = np.nan_to_num(np.nanmedian(residuos, axis=1, keepdims=True))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        escores = np.where(escala > 0, (residuos - centro) / escala, 0.0)
+
+    return np.where(np.isnan(valores), np.nan, escores)
+
+
+@cache_gerenciado
+def detectar_anomalias(valores, sazonalidade=None, limiar=LIMIAR_PADRAO):
+    """Pontua todas as células de uma matriz categoria × período em uma única passada
+
+    `valores` deve ter as colunas 'Descrição' e 'Tipo' seguidas das colunas de
+    período. O resultado é cacheado pelo conteúdo do DataFrame, ou seja, é
+    recalculado apenas quando os dados mudam.
+    """
+    periodos = [col for col in valores.columns if col not in ('Descrição', 'Tipo')]
+    matriz = valores[periodos].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    escores = escores_robustos(matriz, sazonalidade)
+
+    n_categorias, n_periodos = matriz.shape
+    resultado = pd.DataFrame({
+        'Categoria': np.repeat(valores['Descrição'].to_numpy(), n_periodos),
+        'Tipo': np.repeat(valores['Tipo'].to_numpy(), n_periodos),
+        'Período': np.tile(np.asarray(periodos, dtype=object), n_categorias),
+        'Valor': matriz.ravel(),
+        'Escore': escores.ravel()
+    })
+    resultado = resultado.dropna(subset=['Valor'])
+    resultado['Anomalia'] = resultado['Escore'].abs() > limiar
+
+    return resultado.reset_index(drop=True)
+
+
+def top_anomalias(anomalias, n=20):
+    """Retorna as `n` células mais anômalas, ordenadas pelo módulo do escore"""
+    df = anomalias[anomalias['Anomalia']]
+    ordem = df['Escore'].abs().sort_values(ascending=False).index
+    return df.loc[ordem].head(n).reset_index(drop=True)
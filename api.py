@@ -0,0 +1,110 @@
+"""API JSON local com os mesmos cálculos do dashboard
+
+Execução isolada:    uvicorn api:app --port 8502
+Junto do dashboard:  uvicorn servidor:app --port 8501 (mesmo processo e mesmo cache)
+"""
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from financeiro import RelatorioFinanceiro, ARQUIVO_FLUXO, carregar_fluxo
+from lotacao import RelatorioLotacao, ARQUIVO_LOTACAO, carregar_lotacao
+from comparativo_crescimento import ComparativoCrescimento
+from utils.versao import versao_arquivo, versao_combinada
+from utils.cache import CACHE, cache_gerenciado
+
+
+def _registros(df):
+    """Converte um DataFrame em lista de dicionários serializáveis (NaN vira null)"""
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+
+@cache_gerenciado
+def _totais_financeiros(versao, mes):
+    relatorio = RelatorioFinanceiro()
+    relatorio.process_data(mes)
+    meses = relatorio.totais_mensais()
+    return {
+        'meses': meses,
+        'total': {
+            chave: sum(item[chave] for item in meses)
+            for chave in ('receitas', 'despesas', 'lucro')
+        }
+    }
+
+
+@cache_gerenciado
+def _crescimento(versao):
+    relatorio = RelatorioFinanceiro()
+    df_completo, _, _ = ComparativoCrescimento(relatorio.df_fluxo).gerar_relatorio_comparativo()
+    return {'categorias': _registros(df_completo)}
+
+
+@cache_gerenciado
+def _estatisticas_unidades(versao, unidade):
+    relatorio = RelatorioLotacao()
+    unidades = relatorio.df['Unidade'].unique()
+    if unidade:
+        unidades = [u for u in unidades if u == unidade]
+    return {'unidades': [relatorio.calcular_estatisticas_unidade(u) for u in unidades]}
+
+
+async def _responder(request, arquivo, carregar, calcular, *parametros):
+    """Responde com JSON e ETag ligada à versão dos dados, atendendo If-None-Match com 304
+
+    `carregar(arquivo, versao)` confere antes que os dados podem ser lidos: fora de um
+    script do Streamlit o `st.error` do `load_data` dos relatórios não tem efeito, e o
+    erro só apareceria depois, como um AttributeError sem relação com a causa.
+    """
+    try:
+        versao = versao_arquivo(arquivo)
+    except FileNotFoundError:
+        return JSONResponse({'erro': f"Arquivo '{arquivo}' não encontrado"}, status_code=503)
+
+    etag = f'"{versao_combinada(versao, request.url.path, *parametros)}"'
+    cabecalhos = {'ETag': etag, 'Cache-Control': 'no-cache'}
+
+    enviadas = request.headers.get('if-none-match', '')
+    if enviadas.strip() == '*' or etag in [e.strip().removeprefix('W/') for e in enviadas.split(',')]:
+        return Response(status_code=304, headers=cabecalhos)
+
+    # Os cálculos são síncronos (pandas); rodam em thread para não bloquear outros clientes
+    try:
+        # A leitura fica no cache, e os relatórios a reaproveitam em seguida
+        await run_in_threadpool(carregar, arquivo, versao)
+    except Exception as e:
+        return JSONResponse({'erro': f"Erro ao carregar '{arquivo}': {e}"}, status_code=503)
+    dados = await run_in_threadpool(calcular, versao, *parametros)
+    return JSONResponse({'versao': versao, **dados}, headers=cabecalhos)
+
+
+async def totais_financeiros(request):
+    """Totais de receitas, despesas e lucro por mês (?mes=Março para um único mês)"""
+    mes = request.query_params.get('mes')
+    return await _responder(request, ARQUIVO_FLUXO, carregar_fluxo, _totais_financeiros, mes)
+
+
+async def crescimento(request):
+    """Métricas de crescimento por categoria de receita e despesa"""
+    return await _responder(request, ARQUIVO_FLUXO, carregar_fluxo, _crescimento)
+
+
+async def estatisticas_unidades(request):
+    """Capacidade, ocupação e taxa de ocupação por unidade (?unidade=Unid. 1 para filtrar)"""
+    unidade = request.query_params.get('unidade')
+    return await _responder(request, ARQUIVO_LOTACAO, carregar_lotacao, _estatisticas_unidades, unidade)
+
+
+async def metricas_cache(request):
+    """Uso de memória, taxa de acerto e descartes do cache do processo"""
+    return JSONResponse(CACHE.metricas(), headers={'Cache-Control': 'no-store'})
+
+
+ROTAS = [
+    Route('/api/financeiro/totais', totais_financeiros),
+    Route('/api/financeiro/crescimento', crescimento),
+    Route('/api/lotacao/unidades', estatisticas_unidades),
+    Route('/api/cache', metricas_cache),
+]
+
+app = Starlette(routes=ROTAS)
@@ -0,0 +1,129 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from utils.styles import THEME
+from serie_historica import ARQUIVO_HISTORICO, MESES, historico_salvo
+
+
+class ComparativoAnual:
+    def __init__(self, df_fluxo, ano_planilha=None):
+        self.df = df_fluxo
+        self.ano_planilha = ano_planilha
+        self.load_data()
+
+    def load_data(self):
+        """Carrega o histórico salvo (vazio se ainda não houver nenhum)"""
+        self.historico = historico_salvo(ARQUIVO_HISTORICO)
+
+    def salvar_planilha_atual(self):
+        """Grava a planilha carregada no histórico, no ano escolhido"""
+        with st.expander("💾 Histórico de planilhas"):
+            anos = ", ".join(str(ano) for ano in self.historico.anos) or "nenhum"
+            st.caption(f"Anos no histórico: {anos}")
+
+            ano = st.number_input(
+                "Ano da planilha atual",
+                min_value=2000,
+                max_value=2100,
+                value=self.ano_planilha or pd.Timestamp.today().year,
+                step=1,
+                key="ano_planilha"
+            )
+            if st.button("Salvar planilha atual no histórico", key="salvar_historico"):
+                self.historico.registrar(self.df, ano).salvar(ARQUIVO_HISTORICO)
+                st.rerun()
+
+    def plot_comparativo_anos(self, tipo, categoria):
+        """Plota os valores mensais de cada ano sobrepostos"""
+        serie = self.historico.serie(tipo, categoria)
+
+        fig = go.Figure()
+        for i, (ano, dados) in enumerate(serie.groupby('Ano')):
+            fig.add_trace(go.Scatter(
+                x=[MESES[mes - 1] for mes in dados['Mes']],
+                y=dados['Valor'],
+                mode='lines+markers',
+                name=str(ano),
+                line=dict(color=THEME['PIE_COLORS'][i % len(THEME['PIE_COLORS'])], width=3)
+            ))
+
+        fig.update_layout(
+            title=f"{categoria or 'Total de ' + tipo + 's'} — Comparativo entre Anos",
+            xaxis=dict(categoryorder='array', categoryarray=MESES),
+            xaxis_title='Meses',
+            yaxis_title='Valor (R$)',
+            paper_bgcolor=THEME['BG_COLOR'],
+            plot_bgcolor=THEME['BG_COLOR'],
+            font=dict(color=THEME['TEXT_COLOR']),
+            legend=dict(
+                bgcolor=THEME['CARD_COLOR'],
+                font=dict(color=THEME['TEXT_COLOR'])
+            ),
+            hovermode='x unified'
+        )
+
+        st.plotly_chart(fig, use_container_width=True)
+
+    @st.fragment
+    def render_comparativo(self):
+        """Métricas, tabela e gráfico do comparativo ano contra ano (fragmento)"""
+        col1, col2 = st.columns(2)
+        with col1:
+            ano = st.selectbox("Ano", self.historico.anos[::-1], key="yoy_ano")
+        with col2:
+            meses = self.historico.meses_do_ano(ano)
+            mes = st.selectbox("Mês", meses, index=len(meses) - 1, format_func=lambda m: MESES[m - 1], key="yoy_mes")
+
+        totais = self.historico.totais(ano, mes)
+
+        st.markdown(f"<h3 style='color:{THEME['TEXT_COLOR']};'>{MESES[mes - 1]} de {ano} vs. ano anterior</h3>", unsafe_allow_html=True)
+        for rotulo, coluna, variacao in [
+            ("Mês", 'Valor', 'YoY_%'),
+            ("Últimos 12 meses", 'Acumulado_12m', 'Acumulado_12m_%'),
+            ("Acumulado do ano", 'YTD', 'YTD_%')
+        ]:
+            colunas = st.columns(3)
+            for col, tipo in zip(colunas, ['Receita', 'Despesa', 'Lucro']):
+                valor = totais.loc[tipo, coluna]
+                delta = totais.loc[tipo, variacao]
+                with col:
+                    st.metric(
+                        f"{tipo} — {rotulo}",
+                        f"R$ {valor:,.2f}" if pd.notna(valor) else "—",
+                        delta=f"{delta:+.1f}%" if pd.notna(delta) else None
+                    )
+        st.caption("— : o histórico não tem todos os meses do período para calcular o valor.")
+
+        st.dataframe(
+            self.historico.resumo(ano, mes),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                coluna: st.column_config.NumberColumn(coluna.replace('_', ' '), format="%.2f")
+                for coluna in ['Valor', 'Valor_Ano_Anterior', 'Acumulado_12m', 'Acumulado_12m_Anterior', 'YTD', 'YTD_Anterior']
+            }
+        )
+
+        opcoes = ['Total de Receitas', 'Total de Despesas'] + [
+            f"{categoria} ({tipo})" for tipo, categoria in self.historico.categorias
+        ]
+        escolha = st.selectbox("Série para comparar entre anos", opcoes, key="yoy_serie")
+        if escolha == 'Total de Receitas':
+            self.plot_comparativo_anos('Receita', None)
+        elif escolha == 'Total de Despesas':
+            self.plot_comparativo_anos('Despesa', None)
+        else:
+            tipo, categoria = self.historico.categorias[opcoes.index(escolha) - 2]
+            self.plot_comparativo_anos(tipo, categoria)
+
+    def render(self):
+        """Renderiza o comparativo ano contra ano"""
+        st.markdown(f"<h2 style='color:{THEME['TEXT_COLOR']};'>Comparativo Anual</h2>", unsafe_allow_html=True)
+
+        self.salvar_planilha_atual()
+
+        if not self.historico.anos:
+            st.info("Salve a planilha atual no histórico para começar a comparar os anos.")
+            return
+
+        self.render_comparativo()
@@ -5,10 +5,13 @@ import plotly.express as px
 from plotly.subplots import make_subplots
 import numpy as np
 from utils.styles import THEME
+from anomalias import detectar_anomalias, top_anomalias
 
 class ComparativoCrescimento:
-    def __init__(self, df_fluxo):
+    def __init__(self, df_fluxo, ano=None, historico=None):
         self.df = df_fluxo
+        self.ano = ano
+        self.historico = historico
         self.meses = [
             'Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
             'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'
@@ -31,6 +34,29 @@ class ComparativoCrescimento:
             (~self.df['Descrição'].str.contains('DESPESAS', na=False, case=False))
         ].copy()
 
+    def calcular_anomalias(self):
+        """Pontua cada (categoria, mês) de receitas e despesas de uma só vez
+
+        Se o histórico tiver outros anos além do da planilha, a pontuação usa a série
+        de todos os anos, com ajuste sazonal, e devolve só os meses da planilha.
+        """
+        if self.historico is not None and self.ano and any(ano != self.ano for ano in self.historico.anos):
+            # A planilha atual substitui o seu ano no histórico (pode não ter sido salva ainda)
+            quadro, sazonalidade = self.historico.registrar(self.df, self.ano).quadro()
+            rotulos = {f"{mes}/{self.ano}": mes for mes in self.meses_df}
+            anomalias = detectar_anomalias(quadro, sazonalidade)
+            anomalias = anomalias[anomalias['Período'].isin(list(rotulos))]
+            return anomalias.assign(Período=anomalias['Período'].map(rotulos)).reset_index(drop=True)
+
+        colunas = ['Descrição'] + self.meses_df
+        valores = pd.concat([
+            self.receitas[colunas].assign(Tipo='Receita'),
+            self.despesas[colunas].assign(Tipo='Despesa')
+        ], ignore_index=True)
+        # Um único ano: sem ciclo completo, a pontuação é feita sem ajuste sazonal
+        sazonalidade = tuple(self.meses.index(mes) for mes in self.meses_df)
+        return detectar_anomalias(valores, sazonalidade)
+
     def calcular_crescimento_por_categoria(self, df, tipo='receita'):
         """Calcula o crescimento/queda por categoria"""
         resultados = []
@@ -57,7 +83,7 @@ class ComparativoCrescimento:
                 
                 # Tendência geral (regressão linear simples)
                 x = np.arange(len(valores_nao_zero))
-                y = valores_nao_zero.values
+                y = valores_nao_zero.values.astype(float)
                 if len(x) > 1:
                     coef = np.polyfit(x, y, 1)[0]  # coeficiente angular
                     tendencia = 'Crescente' if coef > 0 else 'Decrescente'
@@ -170,8 +196,28 @@ class ComparativoCrescimento:
         return fig
 
     
-    def plot_evolucao_por_categoria(self):
-        """Gráfico de evolução por categoria, com possibilidade de múltiplos filtros"""
+    def plot_top_anomalias(self, anomalias, n=20):
+        """Tabela com as células mais anômalas"""
+        st.markdown(f"<h3 style='color:{THEME['TEXT_COLOR']};'>🚨 Principais Anomalias</h3>", unsafe_allow_html=True)
+
+        ranking = top_anomalias(anomalias, n)
+        if ranking.empty:
+            st.info("Nenhuma anomalia encontrada no período.")
+            return
+
+        st.dataframe(
+            ranking[['Categoria', 'Tipo', 'Período', 'Valor', 'Escore']],
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'Valor': st.column_config.NumberColumn('Valor (R$)', format="%.2f"),
+                'Escore': st.column_config.NumberColumn('Escore Robusto', format="%.2f")
+            }
+        )
+
+    @st.fragment
+    def plot_evolucao_por_categoria(self, anomalias=None):
+        """Gráfico de evolução por categoria, com possibilidade de múltiplos filtros (fragmento)"""
 
         st.markdown(f"<h3 style='color:{THEME['TEXT_COLOR']};'>📈 Evolução por Categoria</h3>", unsafe_allow_html=True)
 
@@ -190,6 +236,12 @@ class ComparativoCrescimento:
             st.warning("Selecione pelo menos uma categoria.")
             return
 
+        st.plotly_chart(self.figura_evolucao(categorias_selecionadas, anomalias), use_container_width=True)
+
+    def figura_evolucao(self, categorias_selecionadas, anomalias=None, visiveis=None):
+        """Monta o gráfico de evolução das categorias; as fora de `visiveis` começam ocultas na legenda"""
+        df_concat = pd.concat([self.receitas.assign(Tipo='Receita'), self.despesas.assign(Tipo='Despesa')], ignore_index=True)
+
         # Filtrar apenas as categorias selecionadas
         df_filtrado = df_concat[df_concat['Descrição'].isin(categorias_selecionadas)]
 
@@ -197,13 +249,39 @@ class ComparativoCrescimento:
         fig = go.Figure()
 
         for _, row in df_filtrado.iterrows():
+            nome = f"{row['Descrição']} ({row['Tipo']})"
+            visivel = True if visiveis is None or row['Descrição'] in visiveis else 'legendonly'
             fig.add_trace(go.Scatter(
                 x=self.meses_df,
                 y=row[self.meses_df].fillna(0),
                 mode='lines+markers',
-                name=f"{row['Descrição']} ({row['Tipo']})"
+                name=nome,
+                legendgroup=nome,
+                visible=visivel
             ))
 
+            # Marcar os meses anômalos desta série (a mesma descrição pode existir em receitas e despesas)
+            if anomalias is None:
+                continue
+            marcadas = anomalias[
+                anomalias['Anomalia'] &
+                (anomalias['Categoria'] == row['Descrição']) &
+                (anomalias['Tipo'] == row['Tipo'])
+            ]
+            if not marcadas.empty:
+                fig.add_trace(go.Scatter(
+                    x=marcadas['Período'],
+                    y=marcadas['Valor'],
+                    mode='markers',
+                    name='Anomalias',
+                    legendgroup=nome,
+                    showlegend=False,
+                    visible=visivel,
+                    marker=dict(symbol='x', size=14, color=THEME['ACCENT3']),
+                    customdata=np.stack([marcadas['Categoria'], marcadas['Escore']], axis=-1),
+                    hovertemplate='%{customdata[0]}<br>%{x}: R$ %{y:,.2f}<br>Escore: %{customdata[1]:.2f}<extra></extra>'
+                ))
+
         fig.update_layout(
             title='Evolução Mensal por Categoria',
             xaxis_title='Meses',
@@ -217,7 +295,7 @@ class ComparativoCrescimento:
             )
         )
 
-        st.plotly_chart(fig, use_container_width=True)
+        return fig
 
 
     def render(self):
@@ -233,7 +311,12 @@ class ComparativoCrescimento:
             return  
 
         # Tabs para diferentes visualizações
-        tab1, = st.tabs(["Evolução"])
+        anomalias = self.calcular_anomalias()
+
+        tab1, tab2 = st.tabs(["Evolução", "Anomalias"])
 
         with tab1:
-            self.plot_evolucao_por_categoria()
+            self.plot_evolucao_por_categoria(anomalias)
+
+        with tab2:
+            self.plot_top_anomalias(anomalias)
@@ -0,0 +1,117 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from utils.styles import THEME
+from historico_lotacao import (
+    PASTA_HISTORICO_LOTACAO, HistoricoLotacao, carregar_historico_lotacao, versao_historico
+)
+
+
+class EvolucaoLotacao:
+    def __init__(self, unidade="Todas"):
+        self.unidade = unidade
+        self.load_data()
+
+    def load_data(self):
+        """Carrega o histórico de uploads (vazio se ainda não houver nenhum)"""
+        try:
+            self.historico = carregar_historico_lotacao(
+                PASTA_HISTORICO_LOTACAO, versao_historico(PASTA_HISTORICO_LOTACAO)
+            )
+        except FileNotFoundError:
+            self.historico = HistoricoLotacao()
+
+    def plot_evolucao(self, serie):
+        """Plota a taxa de ocupação de cada unidade ao longo do período"""
+        fig = go.Figure()
+        for i, (unidade, dados) in enumerate(serie.groupby('Unidade')):
+            cor = THEME['CORES_UNIDADES'].get(unidade, THEME['PIE_COLORS'][i % len(THEME['PIE_COLORS'])])
+            fig.add_trace(go.Scatter(
+                x=dados['Momento'],
+                y=dados['Taxa_Ocupacao'],
+                mode='lines+markers',
+                name=unidade,
+                line=dict(color=cor, width=3),
+                customdata=dados[['Quantidade_Atual', 'Capacidade']],
+                hovertemplate='%{y:.1f}% (%{customdata[0]} de %{customdata[1]} vagas)'
+            ))
+
+        fig.add_hline(y=100, line_dash='dash', line_color=THEME['ACCENT2'],
+                      annotation_text='Capacidade Máxima', annotation_font_color=THEME['TEXT_COLOR'])
+
+        fig.update_layout(
+            paper_bgcolor=THEME['BG_COLOR'],
+            plot_bgcolor=THEME['BG_COLOR'],
+            font=dict(color=THEME['TEXT_COLOR']),
+            legend=dict(
+                bgcolor=THEME['CARD_COLOR'],
+                font=dict(color=THEME['TEXT_COLOR'])
+            ),
+            xaxis=dict(
+                title='Data do upload',
+                showgrid=True,
+                gridcolor=THEME['CARD_COLOR'],
+                gridwidth=0.1,
+                tickfont=dict(color=THEME['TEXT_COLOR'])
+            ),
+            yaxis=dict(
+                title='Taxa de Ocupação (%)',
+                showgrid=True,
+                gridcolor=THEME['CARD_COLOR'],
+                gridwidth=0.1,
+                tickfont=dict(color=THEME['TEXT_COLOR'])
+            ),
+            margin=dict(l=20, r=20, t=40, b=20),
+            hovermode='x unified'
+        )
+
+        st.plotly_chart(fig, use_container_width=True)
+
+    def mostrar_ritmo(self, serie):
+        """Matrículas ganhas no período e o ritmo semanal de cada unidade"""
+        colunas = st.columns(max(serie['Unidade'].nunique(), 1))
+        for col, (unidade, dados) in zip(colunas, serie.groupby('Unidade')):
+            ganho = int(dados['Quantidade_Atual'].iloc[-1] - dados['Quantidade_Atual'].iloc[0])
+            semanas = (dados['Momento'].iloc[-1] - dados['Momento'].iloc[0]) / pd.Timedelta(weeks=1)
+            with col:
+                st.metric(
+                    f"{unidade} — Alunos no período",
+                    f"{int(dados['Quantidade_Atual'].iloc[-1])}",
+                    delta=f"{ganho:+d}"
+                )
+                if semanas > 0:
+                    st.caption(f"Ritmo: {ganho / semanas:+.1f} alunos por semana")
+
+    def render(self):
+        """Renderiza a evolução da ocupação ao longo dos uploads da planilha"""
+        st.markdown(f"<h2 style='color:{THEME['TEXT_COLOR']};'>Evolução da Ocupação</h2>", unsafe_allow_html=True)
+
+        momentos = self.historico.momentos
+        if not momentos:
+            st.info("O histórico é registrado a cada upload da planilha de lotação; envie uma nova planilha para começar.")
+            return
+
+        primeiro, ultimo = momentos[0].date(), momentos[-1].date()
+        periodo = st.date_input(
+            "Período",
+            value=(primeiro, ultimo),
+            min_value=primeiro,
+            max_value=ultimo,
+            format="DD/MM/YYYY",
+            key="periodo_lotacao"
+        )
+        # Enquanto a segunda data não é escolhida o seletor devolve só a primeira
+        inicio, fim = (periodo[0], periodo[-1]) if periodo else (primeiro, ultimo)
+
+        serie = self.historico.serie_unidades(
+            pd.Timestamp(inicio),
+            pd.Timestamp(fim) + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+        )
+        if self.unidade != "Todas":
+            serie = serie[serie['Unidade'] == self.unidade]
+        if serie.empty:
+            st.info("Nenhum upload registrado no período escolhido.")
+            return
+
+        self.mostrar_ritmo(serie)
+        self.plot_evolucao(serie)
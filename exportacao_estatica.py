@@ -0,0 +1,374 @@
+"""Exportação do dashboard para um pacote HTML estático, com as figuras Plotly embutidas
+
+Pré-calcula cada opção dos seletores do dashboard (cada mês do relatório
+financeiro, cada unidade do relatório de lotação e a análise de crescimento) em
+uma página HTML própria, que qualquer servidor de arquivos estáticos entrega sem
+rodar Python. O `manifesto.json` guarda a assinatura dos dados de cada página:
+numa nova exportação só são refeitas as páginas cujos dados mudaram. Mudanças no
+código dos gráficos não entram na assinatura; nesse caso, use `--forcar`.
+
+    python exportacao_estatica.py --saida painel_estatico
+"""
+import os
+import re
+import json
+import argparse
+import unicodedata
+import pandas as pd
+import plotly
+from plotly.offline import get_plotlyjs
+from jinja2 import Template
+from utils.styles import THEME
+from utils.versao import versao_combinada
+from financeiro import RelatorioFinanceiro, ARQUIVO_FLUXO
+from lotacao import RelatorioLotacao, ARQUIVO_LOTACAO
+from comparativo_crescimento import ComparativoCrescimento
+from anomalias import top_anomalias
+from serie_historica import historico_salvo
+
+PASTA_SAIDA = 'painel_estatico'
+ARQUIVO_MANIFESTO = 'manifesto.json'
+ARQUIVO_PLOTLY = 'plotly.min.js'
+
+MODELO_PAGINA = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{{ titulo }} — Dashboard Escolar</title>
+<script src="{{ arquivo_plotly }}"></script>
+<style>
+  body { background: {{ tema.BG_COLOR }}; color: {{ tema.TEXT_COLOR }}; font-family: Arial, sans-serif; margin: 0 auto; max-width: 1400px; padding: 1rem; }
+  a { color: {{ tema.ACCENT1 }}; }
+  h1 { text-align: center; background: {{ tema.CARD_COLOR }}; border-radius: 10px; padding: 1rem; }
+  nav { display: flex; flex-wrap: wrap; gap: .5rem; margin-bottom: 1rem; }
+  nav a { background: {{ tema.CARD_COLOR }}; border-radius: 6px; padding: .4rem .8rem; text-decoration: none; }
+  nav a.atual { background: {{ tema.PRIMARY_BLUE }}; color: {{ tema.TEXT_COLOR }}; }
+  .grupo { background: {{ tema.CARD_COLOR }}; border-radius: 8px; text-align: center; font-weight: bold; padding: 8px; margin-top: 10px; }
+  .metricas { display: flex; gap: 1rem; margin: .5rem 0 1rem; }
+  .metrica { flex: 1; }
+  .metrica .rotulo { font-size: .9rem; opacity: .8; }
+  .metrica .valor { font-size: 1.8rem; }
+  table.tabela { border-collapse: collapse; width: 100%; }
+  table.tabela th, table.tabela td { border-bottom: 1px solid {{ tema.CARD_COLOR }}; padding: .4rem; text-align: left; }
+  footer { font-size: .8rem; opacity: .6; margin-top: 2rem; }
+</style>
+</head>
+<body>
+<h1>Dashboard Escolar</h1>
+<nav>
+{% for secao in secoes %}  <a href="{{ secao.arquivo }}"{% if secao.rotulo == secao_atual %} class="atual"{% endif %}>{{ secao.rotulo }}</a>
+{% endfor %}</nav>
+{% if opcoes %}<nav>
+{% for opcao in opcoes %}  <a href="{{ opcao.arquivo }}"{% if opcao.arquivo == arquivo %} class="atual"{% endif %}>{{ opcao.rotulo }}</a>
+{% endfor %}</nav>{% endif %}
+<h2>{{ titulo }}</h2>
+{% for bloco in blocos %}
+{% if bloco.tipo == 'metricas' %}
+{% if bloco.titulo %}<div class="grupo">{{ bloco.titulo }}</div>{% endif %}
+<div class="metricas">
+{% for rotulo, valor in bloco.itens %}  <div class="metrica"><div class="rotulo">{{ rotulo }}</div><div class="valor">{{ valor }}</div></div>
+{% endfor %}</div>
+{% elif bloco.tipo == 'titulo' %}
+<h3>{{ bloco.texto }}</h3>
+{% elif bloco.tipo == 'aviso' %}
+<p>{{ bloco.texto }}</p>
+{% elif bloco.tipo == 'html' %}
+{{ bloco.html | safe }}
+{% elif bloco.tipo == 'figura' %}
+<div class="figura" id="figura-{{ loop.index }}"></div>
+<script type="application/json" data-figura="figura-{{ loop.index }}">{{ bloco.json | safe }}</script>
+{% endif %}
+{% endfor %}
+<footer>Gerado em {{ gerado_em }}</footer>
+<script>
+  document.querySelectorAll('script[data-figura]').forEach(function (dados) {
+    var fig = JSON.parse(dados.textContent);
+    Plotly.newPlot(dados.dataset.figura, fig.data, fig.layout, {responsive: true});
+  });
+</script>
+</body>
+</html>
+"""
+
+# Páginas de entrada de cada seção; os nomes são fixos para que a navegação
+# entre seções não dependa dos dados (e não force refazer as outras seções)
+SECOES = [
+    {'rotulo': 'Relatório Financeiro', 'arquivo': 'financeiro-todos-os-meses.html'},
+    {'rotulo': 'Análise de Crescimento', 'arquivo': 'crescimento.html'},
+    {'rotulo': 'Relatório de Lotação', 'arquivo': 'lotacao-todas.html'}
+]
+
+
+def _slug(texto):
+    sem_acento = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '-', sem_acento.lower()).strip('-')
+
+
+def assinatura_dados(*partes):
+    """Assinatura do conteúdo dos dados de uma página (DataFrames pelo conteúdo, o resto pelo repr)"""
+    textos = []
+    for parte in partes:
+        if isinstance(parte, pd.DataFrame):
+            conteudo = pd.util.hash_pandas_object(parte, index=False).to_numpy()
+            textos.append(repr(list(parte.columns)) + conteudo.tobytes().hex())
+        else:
+            textos.append(repr(parte))
+    return versao_combinada(*textos)
+
+
+def _figura(fig):
+    # "</" dentro do JSON fecharia a tag <script> antes da hora
+    return {'tipo': 'figura', 'json': fig.to_json().replace('</', '<\\/')}
+
+
+def _tabela(df, formatos=None):
+    formatos = formatos or {}
+    return {
+        'tipo': 'html',
+        'html': df.to_html(index=False, classes='tabela', border=0, formatters=formatos, na_rep='—')
+    }
+
+
+def _reais(valor):
+    return f"R$ {valor:,.2f}"
+
+
+class ExportadorEstatico:
+    def __init__(self, pasta=PASTA_SAIDA):
+        self.pasta = pasta
+        self.caminho_manifesto = os.path.join(pasta, ARQUIVO_MANIFESTO)
+        self.modelo = Template(MODELO_PAGINA)
+        self.load_data()
+
+    def load_data(self):
+        """Carrega os relatórios e o manifesto da exportação anterior (vazio na primeira)"""
+        for arquivo in (ARQUIVO_FLUXO, ARQUIVO_LOTACAO):
+            if not os.path.exists(arquivo):
+                raise FileNotFoundError(f"Arquivo de dados '{arquivo}' não encontrado")
+        self.financeiro = RelatorioFinanceiro()
+        self.lotacao = RelatorioLotacao()
+        self.historico = historico_salvo()
+
+        try:
+            with open(self.caminho_manifesto, encoding='utf-8') as f:
+                self.manifesto = json.load(f)
+        except FileNotFoundError:
+            self.manifesto = {}
+
+    def paginas(self):
+        """Lista (arquivo, assinatura, função que monta a página) de todas as páginas do pacote
+
+        A assinatura cobre só os dados que a página mostra, a lista de opções da sua
+        seção e o modelo HTML; a montagem (cara) só é chamada se a assinatura mudou.
+        """
+        paginas = []
+        df_fluxo = self.financeiro.df_fluxo
+        base = [MODELO_PAGINA, THEME, SECOES]
+
+        meses = ['Todos os meses'] + [col for col in df_fluxo.columns if col in self.financeiro.meses]
+        opcoes_meses = [{'rotulo': mes, 'arquivo': f"financeiro-{_slug(mes)}.html"} for mes in meses]
+        for mes, opcao in zip(meses, opcoes_meses):
+            colunas = list(df_fluxo.columns) if mes == 'Todos os meses' else ['Código', 'Descrição', mes]
+            paginas.append((
+                opcao['arquivo'],
+                assinatura_dados(df_fluxo[colunas], opcoes_meses, *base),
+                lambda mes=mes, arquivo=opcao['arquivo']: self.pagina_financeiro(mes, opcoes_meses, arquivo)
+            ))
+
+        # As anomalias usam os outros anos do histórico, que também entram na assinatura
+        paginas.append((
+            'crescimento.html',
+            assinatura_dados(df_fluxo, self.financeiro.ano, self.historico.registros, *base),
+            self.pagina_crescimento
+        ))
+
+        df_lotacao = self.lotacao.df_completo
+        unidades = ['Todas'] + list(df_lotacao['Unidade'].unique())
+        opcoes_unidades = [{'rotulo': unidade, 'arquivo': f"lotacao-{_slug(unidade)}.html"} for unidade in unidades]
+        for unidade, opcao in zip(unidades, opcoes_unidades):
+            dados = df_lotacao if unidade == 'Todas' else df_lotacao[df_lotacao['Unidade'] == unidade]
+            paginas.append((
+                opcao['arquivo'],
+                assinatura_dados(dados, opcoes_unidades, *base),
+                lambda unidade=unidade, arquivo=opcao['arquivo']: self.pagina_lotacao(unidade, opcoes_unidades, arquivo)
+            ))
+
+        paginas.append((
+            'index.html',
+            assinatura_dados(opcoes_meses, opcoes_unidades, *base),
+            lambda: self.pagina_inicial(opcoes_meses, opcoes_unidades)
+        ))
+        return paginas
+
+    def pagina_financeiro(self, mes, opcoes, arquivo):
+        """Visão geral do relatório financeiro para um mês (ou para todos)"""
+        relatorio = self.financeiro
+        relatorio.process_data(None if mes == 'Todos os meses' else mes)
+        total_receitas = relatorio.receitas[relatorio.meses_df].sum().sum()
+        total_despesas = relatorio.despesas[relatorio.meses_df].sum().sum()
+
+        blocos = [
+            {'tipo': 'metricas', 'titulo': None, 'itens': [
+                ("Total Receitas", _reais(total_receitas)),
+                ("Total Despesas", _reais(total_despesas)),
+                ("Lucro Total", _reais(total_receitas + total_despesas))
+            ]},
+        ]
+        for sizes, labels, nome in [
+            (relatorio.sizes_receitas, relatorio.labels_receitas, "Receitas"),
+            (relatorio.sizes_despesas, relatorio.labels_despesas, "Despesas")
+        ]:
+            if sizes:
+                blocos.append(_figura(relatorio.plot_pie_chart(sizes, labels, f"{nome} por Categoria")))
+            else:
+                blocos.append({'tipo': 'aviso', 'texto': f"Sem {nome.lower()} no período selecionado."})
+        if mes == 'Todos os meses':
+            blocos += [
+                {'tipo': 'titulo', 'texto': "Evolução Mensal: Receitas, Despesas e Lucro"},
+                _figura(relatorio.figura_evolucao_mensal())
+            ]
+
+        relatorio.process_data()
+        return self.montar(f"Relatório Financeiro — {mes}", 'Relatório Financeiro', blocos, opcoes, arquivo)
+
+    def pagina_crescimento(self):
+        """Análise de crescimento: evolução de todas as categorias e principais anomalias"""
+        comparativo = ComparativoCrescimento(self.financeiro.df_fluxo, self.financeiro.ano, self.historico)
+        df_completo, _, _ = comparativo.gerar_relatorio_comparativo()
+        if df_completo.empty:
+            blocos = [{'tipo': 'aviso', 'texto': "Não há dados suficientes para análise de crescimento."}]
+            return self.montar("Análise Comparativa de Crescimento", 'Análise de Crescimento', blocos)
+
+        anomalias = comparativo.calcular_anomalias()
+        categorias = pd.concat([comparativo.receitas, comparativo.despesas])['Descrição'].unique()
+        # Sem o seletor do dashboard, todas as categorias vão no gráfico e a legenda liga/desliga cada uma
+        fig = comparativo.figura_evolucao(categorias, anomalias, visiveis=categorias[:1])
+
+        ranking = top_anomalias(anomalias, 20)
+        blocos = [
+            {'tipo': 'titulo', 'texto': "📈 Evolução por Categoria"},
+            {'tipo': 'aviso', 'texto': "Clique nas categorias da legenda para mostrá-las ou escondê-las."},
+            _figura(fig),
+            {'tipo': 'titulo', 'texto': "🚨 Principais Anomalias"}
+        ]
+        if ranking.empty:
+            blocos.append({'tipo': 'aviso', 'texto': "Nenhuma anomalia encontrada no período."})
+        else:
+            blocos.append(_tabela(
+                ranking[['Categoria', 'Tipo', 'Período', 'Valor', 'Escore']].rename(
+                    columns={'Valor': 'Valor (R$)', 'Escore': 'Escore Robusto'}
+                ),
+                {'Valor (R$)': '{:,.2f}'.format, 'Escore Robusto': '{:.2f}'.format}
+            ))
+        return self.montar("Análise Comparativa de Crescimento", 'Análise de Crescimento', blocos)
+
+    def pagina_lotacao(self, unidade, opcoes, arquivo):
+        """Relatório de lotação de uma unidade (ou de todas)"""
+        relatorio = self.lotacao
+        relatorio.aplicar_filtros({'unidade': unidade})
+
+        blocos = []
+        for nome in relatorio.df['Unidade'].unique():
+            estatisticas = relatorio.calcular_estatisticas_unidade(nome)
+            blocos.append({'tipo': 'metricas', 'titulo': nome, 'itens': [
+                ("Capacidade Total", f"{estatisticas['capacidade_total']}"),
+                ("Ocupação Total", f"{estatisticas['ocupacao_total']}"),
+                ("Taxa de Ocupação", f"{estatisticas['taxa_ocupacao']:.1f}%")
+            ]})
+        blocos += [
+            {'tipo': 'titulo', 'texto': "Ocupação vs Capacidade por Turma"},
+            _figura(relatorio.figura_ocupacao_capacidade()),
+            {'tipo': 'titulo', 'texto': "Taxa de Ocupação por Turma"},
+            _figura(relatorio.figura_taxa_ocupacao()),
+            {'tipo': 'titulo', 'texto': "Comparativo de Médias por Unidade"},
+            _figura(relatorio.figura_comparativo_medias())
+        ]
+
+        relatorio.aplicar_filtros()
+        return self.montar(f"Análise de Lotação — {unidade}", 'Relatório de Lotação', blocos, opcoes, arquivo)
+
+    def pagina_inicial(self, opcoes_meses, opcoes_unidades):
+        """Índice com os links para todas as páginas"""
+        blocos = [
+            {'tipo': 'titulo', 'texto': "Relatório Financeiro"},
+            {'tipo': 'html', 'html': ' · '.join(f'<a href="{o["arquivo"]}">{o["rotulo"]}</a>' for o in opcoes_meses)},
+            {'tipo': 'titulo', 'texto': "Análise de Crescimento"},
+            {'tipo': 'html', 'html': '<a href="crescimento.html">Evolução por categoria e anomalias</a>'},
+            {'tipo': 'titulo', 'texto': "Relatório de Lotação"},
+            {'tipo': 'html', 'html': ' · '.join(f'<a href="{o["arquivo"]}">{o["rotulo"]}</a>' for o in opcoes_unidades)}
+        ]
+        return self.montar("Painel", None, blocos)
+
+    def montar(self, titulo, secao, blocos, opcoes=(), arquivo=None):
+        """HTML da página; `arquivo` destaca a opção atual na navegação da seção"""
+        return self.modelo.render(
+            titulo=titulo,
+            secao_atual=secao,
+            secoes=SECOES,
+            opcoes=opcoes,
+            arquivo=arquivo,
+            blocos=blocos,
+            tema=THEME,
+            arquivo_plotly=ARQUIVO_PLOTLY,
+            gerado_em=pd.Timestamp.now().strftime('%d/%m/%Y %H:%M')
+        )
+
+    def exportar(self, forcar=False):
+        """Gera as páginas novas ou com dados alterados e remove as que deixaram de existir
+
+        Retorna as listas de páginas geradas, mantidas e removidas.
+        """
+        os.makedirs(self.pasta, exist_ok=True)
+        resultado = {'geradas': [], 'mantidas': [], 'removidas': []}
+        manifesto = {}
+
+        caminho_plotly = os.path.join(self.pasta, ARQUIVO_PLOTLY)
+        if forcar or self.manifesto.get(ARQUIVO_PLOTLY) != plotly.__version__ or not os.path.exists(caminho_plotly):
+            with open(caminho_plotly, 'w', encoding='utf-8') as f:
+                f.write(get_plotlyjs())
+        manifesto[ARQUIVO_PLOTLY] = plotly.__version__
+
+        for arquivo, assinatura, montar in self.paginas():
+            caminho = os.path.join(self.pasta, arquivo)
+            manifesto[arquivo] = assinatura
+            if not forcar and self.manifesto.get(arquivo) == assinatura and os.path.exists(caminho):
+                resultado['mantidas'].append(arquivo)
+                continue
+
+            html = montar()
+            temporario = f"{caminho}.tmp"
+            with open(temporario, 'w', encoding='utf-8') as f:
+                f.write(html)
+            os.replace(temporario, caminho)
+            resultado['geradas'].append(arquivo)
+
+        for arquivo in set(self.manifesto) - set(manifesto):
+            caminho = os.path.join(self.pasta, arquivo)
+            if os.path.exists(caminho):
+                os.remove(caminho)
+            resultado['removidas'].append(arquivo)
+
+        with open(self.caminho_manifesto, 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=2)
+        self.manifesto = manifesto
+        return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--saida', default=PASTA_SAIDA, help='pasta do pacote estático')
+    parser.add_argument('--forcar', action='store_true', help='refaz todas as páginas')
+    args = parser.parse_args()
+
+    resultado = ExportadorEstatico(args.saida).exportar(forcar=args.forcar)
+    print(f"{len(resultado['geradas'])} páginas geradas, {len(resultado['mantidas'])} mantidas, "
+          f"{len(resultado['removidas'])} removidas em '{args.saida}'")
+    for arquivo in resultado['geradas']:
+        print(f"  + {arquivo}")
+    for arquivo in resultado['removidas']:
+        print(f"  - {arquivo}")
+
+
+if __name__ == "__main__":
+    main()
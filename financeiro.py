@@ -1,26 +1,76 @@
+import os
+import re
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from utils.styles import THEME
+from utils.versao import versao_arquivo
+from utils.cache import cache_gerenciado
+from utils.leitor_excel import ler_excel
 from comparativo_crescimento import ComparativoCrescimento
+from comparativo_anual import ComparativoAnual
+from serie_historica import historico_salvo
+from lancamentos import ARQUIVO_CUBO, carregar_lancamentos
 
+ARQUIVO_FLUXO = 'fluxo_de_caixa.xlsx'
+
+# Origem dos dados financeiros: a planilha mensal pronta ou o cubo montado dos lançamentos
+FONTE_PLANILHA = 'Planilha mensal'
+FONTE_LANCAMENTOS = 'Lançamentos'
+
+MESES = [
+    'Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
+    'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'
+]
+
+
+@cache_gerenciado
+def carregar_fluxo(caminho, versao):
+    """Lê a planilha de fluxo de caixa; `versao` invalida o cache quando o arquivo muda"""
+    # Só as colunas usadas nos relatórios: código, descrição e meses
+    colunas = {'Código', 'Descrição', *MESES}
+    df_fluxo = ler_excel(caminho, skiprows=3, usecols=lambda c: str(c).strip() in colunas)
+    df_fluxo.columns = [c.strip() for c in df_fluxo.columns]
+    return df_fluxo
+
+
+@cache_gerenciado
+def ler_ano_fluxo(caminho, versao):
+    """Lê o ano do título da planilha ('Fluxo de caixa 2025'); None se não houver"""
+    titulo = ler_excel(caminho, header=None, nrows=1, usecols=[0]).iat[0, 0]
+    encontrado = re.search(r'(19|20)\d{2}', str(titulo))
+    return int(encontrado.group()) if encontrado else None
+
+
+@cache_gerenciado
+def figura_filtro_meses(_relatorio, versao):
+    """Figura com todos os meses embutidos, montada uma única vez por versão dos dados"""
+    return _relatorio.plot_receitas_despesas_por_mes()
 
 
 class RelatorioFinanceiro:
-    def __init__(self):
-        self.meses = [
-            'Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
-            'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'
-        ]
+    def __init__(self, fonte=FONTE_PLANILHA):
+        self.meses = list(MESES)
+        self.fonte = fonte
         self.load_data()
         self.process_data()
 
     def load_data(self):
-        """Carrega os dados do arquivo Excel"""
+        """Carrega os dados do arquivo Excel ou do cubo de lançamentos"""
         try:
-            self.df_fluxo = pd.read_excel('fluxo_de_caixa.xlsx', skiprows=3)
-            self.df_fluxo.columns = [c.strip() for c in self.df_fluxo.columns]
+            if self.fonte == FONTE_LANCAMENTOS:
+                if not os.path.exists(ARQUIVO_CUBO):
+                    # Nenhum lançamento enviado ainda: relatório vazio até o primeiro upload
+                    self.versao, self.ano = None, None
+                    self.df_fluxo = pd.DataFrame(columns=['Código', 'Descrição'])
+                    return
+                self.versao = versao_arquivo(ARQUIVO_CUBO)
+                self.df_fluxo, self.ano = carregar_lancamentos(ARQUIVO_CUBO, self.versao)
+                return
+            self.versao = versao_arquivo(ARQUIVO_FLUXO)
+            self.df_fluxo = carregar_fluxo(ARQUIVO_FLUXO, self.versao)
+            self.ano = ler_ano_fluxo(ARQUIVO_FLUXO, self.versao)
         except Exception as e:
             st.error(f"Erro ao carregar dados: {e}")
         
@@ -51,6 +101,9 @@ class RelatorioFinanceiro:
     def agrupar_outros(self, labels, sizes, threshold=0.01):
         """Agrupa pequenas fatias em 'Outros'"""
         total = sizes.sum()
+        # Período sem valores (ex.: mês recém-aberto só com despesas): nada a mostrar
+        if total == 0:
+            return [], []
         new_labels = []
         new_sizes = []
         outros = 0
@@ -90,6 +143,18 @@ class RelatorioFinanceiro:
         self.despesas_mensais = self.despesas[self.meses_df].sum()
         self.lucro_mensal = self.receitas_mensais + self.despesas_mensais
 
+    def totais_mensais(self):
+        """Totais de receitas, despesas e lucro por mês do período processado"""
+        return [
+            {
+                'mes': mes,
+                'receitas': float(self.receitas_mensais[mes]),
+                'despesas': float(self.despesas_mensais[mes]),
+                'lucro': float(self.lucro_mensal[mes])
+            }
+            for mes in self.meses_df
+        ]
+
     def plot_pie_chart(self, sizes, labels, title):
         """Plota um gráfico de pizza interativo"""
         fig = go.Figure(
@@ -98,7 +163,7 @@ class RelatorioFinanceiro:
                 values=sizes,
                 textinfo='percent+label',
                 textposition='outside',
-                pull=[0.1 if v/sum(sizes) > 0.10 else 0 for v in sizes],
+                pull=[0.1 if sum(sizes) and v / sum(sizes) > 0.10 else 0 for v in sizes],
                 marker=dict(colors=THEME['PIE_COLORS'][:len(labels)]),
                 showlegend=True
             )]
@@ -133,20 +198,113 @@ class RelatorioFinanceiro:
         col1, col2 = st.columns(2)
 
         with col1:
-            fig_receitas = self.plot_pie_chart(
-                self.sizes_receitas,
-                self.labels_receitas,
-                "Receitas por Categoria"
-            )
-            st.plotly_chart(fig_receitas, use_container_width=True)
+            if self.sizes_receitas:
+                fig_receitas = self.plot_pie_chart(
+                    self.sizes_receitas,
+                    self.labels_receitas,
+                    "Receitas por Categoria"
+                )
+                st.plotly_chart(fig_receitas, use_container_width=True)
+            else:
+                st.info("Sem receitas no período selecionado.")
 
         with col2:
-            fig_despesas = self.plot_pie_chart(
-                self.sizes_despesas,
-                self.labels_despesas,
-                "Despesas por Categoria"
-            )
-            st.plotly_chart(fig_despesas, use_container_width=True)
+            if self.sizes_despesas:
+                fig_despesas = self.plot_pie_chart(
+                    self.sizes_despesas,
+                    self.labels_despesas,
+                    "Despesas por Categoria"
+                )
+                st.plotly_chart(fig_despesas, use_container_width=True)
+            else:
+                st.info("Sem despesas no período selecionado.")
+
+    def plot_receitas_despesas_por_mes(self):
+        """Pizzas de receitas e despesas com todos os meses embutidos e seletor de mês no navegador"""
+        meses_disponiveis = [col for col in self.df_fluxo.columns if col in self.meses]
+        opcoes = ['Todos os meses'] + meses_disponiveis
+
+        dados = []
+        for opcao in opcoes:
+            self.process_data(None if opcao == 'Todos os meses' else opcao)
+            total_receitas = self.receitas[self.meses_df].sum().sum()
+            total_despesas = self.despesas[self.meses_df].sum().sum()
+            dados.append({
+                'labels': [list(self.labels_receitas), list(self.labels_despesas)],
+                'values': [
+                    [float(v) for v in self.sizes_receitas],
+                    [float(v) for v in self.sizes_despesas]
+                ],
+                'titulo': (
+                    f"{opcao} — Receitas: R$ {total_receitas:,.2f} | "
+                    f"Despesas: R$ {total_despesas:,.2f} | "
+                    f"Lucro: R$ {total_receitas + total_despesas:,.2f}"
+                )
+            })
+
+        # Restaura o estado para o período completo
+        self.process_data()
+
+        def argumentos(item):
+            return [
+                {
+                    'labels': item['labels'],
+                    'values': item['values'],
+                    'pull': [
+                        [0.1 if sum(valores) and v / sum(valores) > 0.10 else 0 for v in valores]
+                        for valores in item['values']
+                    ],
+                    'marker.colors': [THEME['PIE_COLORS'][:len(labels)] for labels in item['labels']]
+                },
+                {'title.text': item['titulo']}
+            ]
+
+        fig = go.Figure()
+        for i, (nome, dominio) in enumerate([('Receitas', [0, 0.48]), ('Despesas', [0.52, 1])]):
+            fig.add_trace(go.Pie(
+                labels=dados[0]['labels'][i],
+                values=dados[0]['values'][i],
+                name=nome,
+                title=dict(text=nome, font=dict(color=THEME['TEXT_COLOR'], size=16)),
+                domain=dict(x=dominio),
+                textinfo='percent+label',
+                textposition='outside'
+            ))
+        fig.update(data=argumentos(dados[0])[0])
+
+        fig.update_traces(
+            textfont=dict(size=14, color=THEME['TEXT_COLOR']),
+            hoverinfo='label+percent+value',
+            texttemplate='%{percent}'
+        )
+
+        fig.update_layout(
+            title=dict(
+                text=dados[0]['titulo'],
+                font=dict(color=THEME['TEXT_COLOR'], size=18),
+                x=0.5
+            ),
+            updatemenus=[dict(
+                buttons=[
+                    dict(label=opcao, method='update', args=argumentos(item))
+                    for opcao, item in zip(opcoes, dados)
+                ],
+                direction='down',
+                x=0,
+                xanchor='left',
+                y=1.2,
+                yanchor='top',
+                bgcolor=THEME['CARD_COLOR'],
+                font=dict(color=THEME['TEXT_COLOR'])
+            )],
+            paper_bgcolor=THEME['BG_COLOR'],
+            plot_bgcolor=THEME['BG_COLOR'],
+            margin=dict(t=100, l=20, r=20, b=20),
+            showlegend=False,
+            height=550
+        )
+
+        return fig
 
     def plot_evolucao_mensal(self):
         """Plota o gráfico de evolução mensal interativo"""
@@ -154,7 +312,10 @@ class RelatorioFinanceiro:
             f"<h3 style='color:{THEME['TEXT_COLOR']};'>Evolução Mensal: Receitas, Despesas e Lucro</h3>",
             unsafe_allow_html=True
         )
+        st.plotly_chart(self.figura_evolucao_mensal(), use_container_width=True)
 
+    def figura_evolucao_mensal(self):
+        """Monta o gráfico de evolução mensal"""
         fig = go.Figure()
 
         # Adicionar barras de receitas
@@ -208,47 +369,74 @@ class RelatorioFinanceiro:
             hovermode='x unified'
         )
 
-        st.plotly_chart(fig, use_container_width=True)
+        return fig
+
     def render_comparativo_crescimento(self):
         """Renderiza a análise comparativa de crescimento"""
-        comparativo = ComparativoCrescimento(self.df_fluxo)
+        comparativo = ComparativoCrescimento(self.df_fluxo, self.ano, historico_salvo())
+        comparativo.render()
+
+    def render_comparativo_anual(self):
+        """Renderiza o comparativo ano contra ano"""
+        comparativo = ComparativoAnual(self.df_fluxo, self.ano)
         comparativo.render()
     
-    def render(self):
+    def render_visao_geral_cliente(self):
+        """Visão geral com filtro de mês feito no navegador, sem rerun no servidor"""
+        st.plotly_chart(figura_filtro_meses(self, self.versao), use_container_width=True)
+        self.plot_evolucao_mensal()
+
+    @st.fragment
+    def render_visao_geral(self):
+        """Visão geral com seletor de mês; trocar o mês reexecuta só este trecho (fragmento)"""
+        # Opções da lista completa: o rerun do fragmento reaproveita este objeto, cujo
+        # `meses_df` ficou restrito ao mês escolhido na execução anterior
+        meses_opcoes = ['Todos os meses'] + [col for col in self.df_fluxo.columns if col in self.meses]
+        selected_month = st.selectbox('Selecione o mês:', meses_opcoes, key='mes_visao_geral')
+
+        if selected_month == 'Todos os meses':
+            self.process_data()
+        else:
+            self.process_data(selected_month)
+
+        # Mostrar totais do período selecionado
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            total_receitas = self.receitas[self.meses_df].sum().sum()
+            st.metric("Total Receitas", f"R$ {total_receitas:,.2f}")
+        with col2:
+            total_despesas = self.despesas[self.meses_df].sum().sum()
+            st.metric("Total Despesas", f"R$ {total_despesas:,.2f}")
+        with col3:
+            lucro_total = total_receitas + total_despesas
+            st.metric("Lucro Total", f"R$ {lucro_total:,.2f}")
+
+        self.plot_receitas_despesas()
+
+        if selected_month == 'Todos os meses':
+            self.plot_evolucao_mensal()
+
+    def render(self, modo_cliente=False):
         """Renderiza todo o relatório financeiro"""
         # Código existente...
         st.markdown(f"<h2 style='color:{THEME['TEXT_COLOR']};'>Relatório Financeiro</h2>", unsafe_allow_html=True)
 
+        if not self.meses_df:
+            st.info("Envie os arquivos de lançamentos na barra lateral para montar o relatório.")
+            return
+
         # Criar abas
-        tab1, tab2 = st.tabs(["📊 Visão Geral", "📈 Análise de Crescimento"])
+        tab1, tab2, tab3 = st.tabs(["📊 Visão Geral", "📈 Análise de Crescimento", "📅 Comparativo Anual"])
         
         with tab1:
-            # Código existente do relatório (seletor de mês, métricas, gráficos)
-            meses_opcoes = ['Todos os meses'] + self.meses_df
-            selected_month = st.selectbox('Selecione o mês:', meses_opcoes)
-
-            if selected_month == 'Todos os meses':
-                self.process_data()
+            if modo_cliente:
+                self.render_visao_geral_cliente()
             else:
-                self.process_data(selected_month)
-
-            # Mostrar totais do período selecionado
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                total_receitas = self.receitas[self.meses_df].sum().sum()
-                st.metric("Total Receitas", f"R$ {total_receitas:,.2f}")
-            with col2:
-                total_despesas = self.despesas[self.meses_df].sum().sum()
-                st.metric("Total Despesas", f"R$ {total_despesas:,.2f}")
-            with col3:
-                lucro_total = total_receitas + total_despesas
-                st.metric("Lucro Total", f"R$ {lucro_total:,.2f}")
-
-            self.plot_receitas_despesas()
-
-            if selected_month == 'Todos os meses':
-                self.plot_evolucao_mensal()
+                self.render_visao_geral()
         
         with tab2:
             # Nova funcionalidade de análise comparativa
             self.render_comparativo_crescimento()
+
+        with tab3:
+            self.render_comparativo_anual()
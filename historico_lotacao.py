@@ -0,0 +1,187 @@
+"""Histórico de lotação: cada upload da planilha vira um delta em um log local só de acréscimos
+
+Cada registro grava, em um segmento Parquet novo, apenas as turmas que mudaram
+desde o estado anterior (chave Unidade, SALA, TURMA), inclusive as removidas,
+que entram com capacidade e quantidade zeradas. Segmentos nunca são alterados;
+de tempos em tempos são compactados em um único arquivo colunar ordenado por
+momento, e o estado em qualquer data sai de um forward-fill dos eventos.
+
+    python historico_lotacao.py lotacao_2026-01-15.xls --momento 2026-01-15
+    python historico_lotacao.py --compactar
+"""
+import os
+import glob
+import argparse
+import threading
+import pandas as pd
+from utils.cache import cache_gerenciado
+from utils.versao import versao_arquivo, versao_combinada
+
+PASTA_HISTORICO_LOTACAO = 'historico_lotacao'
+ARQUIVO_COMPACTADO = 'compactado.parquet'
+PREFIXO_SEGMENTO = 'delta-'
+
+# Quantidade de segmentos que dispara a compactação automática
+LIMITE_SEGMENTOS = 30
+
+CHAVE = ['Unidade', 'SALA', 'TURMA']
+VALORES = ['Capacidade', 'Quantidade_Atual']
+COLUNAS = ['Momento'] + CHAVE + VALORES + ['Removida']
+
+_trava = threading.Lock()
+
+
+def versao_historico(pasta=PASTA_HISTORICO_LOTACAO):
+    """Versão do histórico a partir dos arquivos da pasta, sem lê-los"""
+    if not os.path.isdir(pasta):
+        raise FileNotFoundError(pasta)
+    arquivos = sorted(glob.glob(os.path.join(pasta, '*.parquet')))
+    return versao_combinada(*(f"{os.path.basename(a)}:{versao_arquivo(a)}" for a in arquivos))
+
+
+class HistoricoLotacao:
+    def __init__(self, pasta=PASTA_HISTORICO_LOTACAO):
+        self.pasta = pasta
+        self.load_data()
+
+    @property
+    def segmentos(self):
+        return sorted(glob.glob(os.path.join(self.pasta, f"{PREFIXO_SEGMENTO}*.parquet")))
+
+    def load_data(self):
+        """Lê o arquivo compactado e os segmentos ainda não compactados"""
+        partes = [pd.DataFrame(columns=COLUNAS)]
+        compactado = os.path.join(self.pasta, ARQUIVO_COMPACTADO)
+        if os.path.exists(compactado):
+            partes.append(pd.read_parquet(compactado))
+        partes += [pd.read_parquet(segmento) for segmento in self.segmentos]
+
+        eventos = pd.concat([p for p in partes if not p.empty] or partes[:1], ignore_index=True)
+        eventos['Momento'] = pd.to_datetime(eventos['Momento'])
+        eventos[VALORES] = eventos[VALORES].astype(int)
+        eventos['Removida'] = eventos['Removida'].astype(bool)
+        # Uma compactação interrompida pode deixar o mesmo evento no compactado e no segmento
+        self.eventos = (
+            eventos.drop_duplicates(subset=['Momento'] + CHAVE, keep='last')
+            .sort_values(['Momento'] + CHAVE, kind='stable')
+            .reset_index(drop=True)
+        )
+
+    @property
+    def momentos(self):
+        return list(self.eventos['Momento'].drop_duplicates())
+
+    def estado(self, momento=None):
+        """Turmas e seus valores no momento informado (no último registro, se None)"""
+        eventos = self.eventos
+        if momento is not None:
+            # Eventos ordenados por momento: o recorte é uma busca binária
+            eventos = eventos.iloc[:eventos['Momento'].searchsorted(pd.Timestamp(momento), side='right')]
+        ultimos = eventos.drop_duplicates(subset=CHAVE, keep='last')
+        return ultimos.loc[~ultimos['Removida'], CHAVE + VALORES].reset_index(drop=True)
+
+    def registrar(self, df_lotacao, momento=None):
+        """Grava como novo segmento as turmas que mudaram em relação ao último estado
+
+        Retorna quantas turmas entraram no delta (0 se a planilha não mudou nada).
+        """
+        momento = pd.Timestamp(momento) if momento is not None else pd.Timestamp.now()
+        atual = df_lotacao.groupby(CHAVE, as_index=False)[VALORES].sum()
+        atual[VALORES] = atual[VALORES].astype(int)
+
+        with _trava:
+            self.load_data()
+            if not self.eventos.empty and momento <= self.eventos['Momento'].iloc[-1]:
+                raise ValueError(
+                    f"O histórico já tem registros em {self.eventos['Momento'].iloc[-1]:%d/%m/%Y %H:%M}; "
+                    "só é possível acrescentar momentos posteriores"
+                )
+
+            comparacao = atual.merge(self.estado(), on=CHAVE, how='outer', suffixes=('', '_anterior'), indicator=True)
+            novas_ou_alteradas = (comparacao['_merge'] == 'left_only') | (
+                (comparacao['_merge'] == 'both') & (
+                    (comparacao['Capacidade'] != comparacao['Capacidade_anterior']) |
+                    (comparacao['Quantidade_Atual'] != comparacao['Quantidade_Atual_anterior'])
+                )
+            )
+            removidas = comparacao['_merge'] == 'right_only'
+
+            delta = pd.concat([
+                comparacao.loc[novas_ou_alteradas, CHAVE + VALORES].assign(Removida=False),
+                comparacao.loc[removidas, CHAVE].assign(Capacidade=0, Quantidade_Atual=0, Removida=True)
+            ], ignore_index=True)
+            if delta.empty:
+                return 0
+
+            delta.insert(0, 'Momento', momento)
+            delta[VALORES] = delta[VALORES].astype(int)
+            os.makedirs(self.pasta, exist_ok=True)
+            self._gravar(delta[COLUNAS], f"{PREFIXO_SEGMENTO}{momento:%Y%m%dT%H%M%S%f}.parquet")
+
+            if len(self.segmentos) >= LIMITE_SEGMENTOS:
+                self._compactar()
+            self.load_data()
+        return len(delta)
+
+    def compactar(self):
+        """Junta o compactado e os segmentos em um único arquivo ordenado por momento"""
+        with _trava:
+            self._compactar()
+            self.load_data()
+
+    def _compactar(self):
+        segmentos = self.segmentos
+        if not segmentos:
+            return
+        self.load_data()
+        self._gravar(self.eventos[COLUNAS], ARQUIVO_COMPACTADO)
+        for segmento in segmentos:
+            os.remove(segmento)
+
+    def _gravar(self, df, nome):
+        """Grava de forma atômica (arquivo temporário + rename)"""
+        caminho = os.path.join(self.pasta, nome)
+        df.to_parquet(f"{caminho}.tmp", index=False)
+        os.replace(f"{caminho}.tmp", caminho)
+
+    def serie_unidades(self, inicio=None, fim=None):
+        """Capacidade, alunos e taxa de ocupação de cada unidade em cada registro do período"""
+        eventos = self.eventos
+        if fim is not None:
+            eventos = eventos.iloc[:eventos['Momento'].searchsorted(pd.Timestamp(fim), side='right')]
+        if eventos.empty:
+            return pd.DataFrame(columns=['Momento', 'Unidade'] + VALORES + ['Taxa_Ocupacao'])
+
+        # Estado de cada turma em cada momento: o último evento até ali (removidas valem zero)
+        estados = eventos.pivot(index='Momento', columns=CHAVE, values=VALORES).ffill().fillna(0)
+        serie = estados.stack(level=CHAVE, future_stack=True).groupby(['Momento', 'Unidade'])[VALORES].sum().reset_index()
+        serie[VALORES] = serie[VALORES].astype(int)
+        serie['Taxa_Ocupacao'] = serie['Quantidade_Atual'] / serie['Capacidade'].where(serie['Capacidade'] > 0) * 100
+        if inicio is not None:
+            serie = serie[serie['Momento'] >= pd.Timestamp(inicio)]
+        return serie[['Momento', 'Unidade'] + VALORES + ['Taxa_Ocupacao']].reset_index(drop=True)
+
+
+@cache_gerenciado
+def carregar_historico_lotacao(pasta, versao):
+    """Histórico de lotação; `versao` invalida o cache quando um segmento é gravado ou compactado"""
+    return HistoricoLotacao(pasta)
+
+
+if __name__ == "__main__":
+    from lotacao import carregar_lotacao
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('planilhas', nargs='*', help='planilhas de lotação, na ordem em que foram tiradas')
+    parser.add_argument('--momento', action='append', help='data de cada planilha (padrão: agora)')
+    parser.add_argument('--compactar', action='store_true', help='compacta os segmentos ao final')
+    args = parser.parse_args()
+
+    historico = HistoricoLotacao()
+    momentos = args.momento or [None] * len(args.planilhas)
+    for planilha, momento in zip(args.planilhas, momentos):
+        alteradas = historico.registrar(carregar_lotacao(planilha, versao_arquivo(planilha)), momento)
+        print(f"{planilha}: {alteradas} turmas alteradas")
+    if args.compactar:
+        historico.compactar()
+    print(f"{len(historico.momentos)} registros, {len(historico.segmentos)} segmentos não compactados")
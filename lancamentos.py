@@ -0,0 +1,306 @@
+"""Ingestão de lançamentos individuais (data, conta, valor) no cubo conta × mês do dashboard
+
+Os arquivos (CSV ou XLSX, com milhões de linhas) são lidos em blocos e somados
+por conta e mês à medida que chegam, com memória proporcional ao número de contas
+e meses, nunca ao de lançamentos. O progresso de cada arquivo é gravado junto com
+o cubo a cada bloco: uma ingestão interrompida continua de onde parou, e um
+arquivo que cresceu (novos dias no fim) só tem as linhas novas processadas.
+
+    python lancamentos.py extrato_banco.csv exportacao_erp.xlsx
+"""
+import io
+import os
+import csv
+import sys
+import zipfile
+import hashlib
+import unicodedata
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+from utils.cache import cache_gerenciado
+
+ARQUIVO_CUBO = 'lancamentos_mensais.parquet'
+PASTA_LANCAMENTOS = 'lancamentos'
+TAMANHO_BLOCO = 100_000
+
+# Bytes do início de um CSV usados para perceber se ele foi trocado (e não apenas estendido)
+LIMITE_ASSINATURA = 64 * 1024
+
+MESES = [
+    'Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
+    'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'
+]
+
+# Nomes aceitos para cada coluna do arquivo (sem acento, minúsculos)
+NOMES_COLUNAS = {
+    'data': ['data', 'data_lancamento', 'dt_lancamento', 'date'],
+    'conta': ['conta', 'codigo', 'cod_conta', 'account'],
+    'valor': ['valor', 'vlr', 'amount'],
+    'descricao': ['descricao', 'descricao_conta', 'historico', 'description']
+}
+
+
+def _normalizar(nome):
+    sem_acento = unicodedata.normalize('NFKD', str(nome)).encode('ascii', 'ignore').decode()
+    return sem_acento.strip().lower().replace(' ', '_')
+
+
+def _identificar_colunas(cabecalho):
+    """Mapeia data/conta/valor/descrição para as colunas do arquivo; descrição é opcional"""
+    normalizados = {_normalizar(c): c for c in cabecalho}
+    colunas = {}
+    for campo, nomes in NOMES_COLUNAS.items():
+        encontrado = next((normalizados[n] for n in nomes if n in normalizados), None)
+        if encontrado is not None:
+            colunas[campo] = encontrado
+        elif campo != 'descricao':
+            raise ValueError(f"Coluna de {campo} não encontrada; colunas do arquivo: {list(cabecalho)}")
+    return colunas
+
+
+def _assinatura_inicio(caminho, ate):
+    """Hash dos primeiros bytes já consumidos do arquivo (até LIMITE_ASSINATURA)"""
+    with open(caminho, 'rb') as f:
+        return hashlib.sha1(f.read(min(ate, LIMITE_ASSINATURA))).hexdigest()
+
+
+def _arquivo_substituido(caminho):
+    return ValueError(
+        f"'{caminho}' foi substituído por outro conteúdo; grave os novos lançamentos "
+        "no fim do arquivo ou use um arquivo com outro nome"
+    )
+
+
+def _arquivo_ilegivel(caminho, erro):
+    return ValueError(f"'{caminho}' não pôde ser lido como planilha de lançamentos ({erro})")
+
+
+def _numero(serie):
+    """Converte valores como '1.234,56', '1.500' (mil e quinhentos) ou '-1234.56' em float"""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float)
+    texto = serie.astype(str).str.strip().str.replace('R$', '', regex=False).str.replace(' ', '', regex=False)
+    # Vírgula decimal, ou só pontos separando grupos de três dígitos (separador de milhar)
+    brasileiro = texto.str.contains(',', regex=False) | texto.str.fullmatch(r'-?\d{1,3}(\.\d{3})+')
+    texto = texto.where(~brasileiro, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(texto, errors='coerce')
+
+
+def _datas(serie):
+    """Converte datas em dia/mês/ano ou ISO (ano-mês-dia), mesmo misturadas no mesmo bloco
+
+    Os formatos explícitos evitam que o pandas deduza o formato do primeiro valor e
+    descarte os demais; o que não se encaixar em nenhum passa pelo parser genérico.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    texto = serie.astype(str).str.strip()
+    datas = pd.to_datetime(texto, format='%d/%m/%Y', errors='coerce')
+    for formato in ('ISO8601', 'mixed'):
+        faltando = datas.isna() & serie.notna()
+        if not faltando.any():
+            break
+        datas[faltando] = pd.to_datetime(texto[faltando], format=formato, dayfirst=True, errors='coerce')
+    return datas
+
+
+def _blocos_csv(caminho, tamanho_bloco, progresso):
+    """Blocos de linhas ainda não lidas, a partir do byte em que a leitura anterior parou"""
+    with open(caminho, newline='', encoding='utf-8-sig') as f:
+        try:
+            separador = csv.Sniffer().sniff(f.readline(), delimiters=',;\t|').delimiter
+        except csv.Error as e:
+            # Arquivo vazio ou de uma coluna só: nenhum separador reconhecível no cabeçalho
+            raise _arquivo_ilegivel(caminho, e) from e
+    cabecalho = pd.read_csv(caminho, sep=separador, nrows=0, encoding='utf-8-sig').columns
+    colunas = _identificar_colunas(cabecalho)
+
+    with open(caminho, 'rb') as f:
+        posicao = progresso.get('bytes')
+        if posicao is None:
+            f.readline()
+            posicao = f.tell()
+        elif os.path.getsize(caminho) < posicao or _assinatura_inicio(caminho, posicao) != progresso['assinatura']:
+            raise _arquivo_substituido(caminho)
+        f.seek(posicao)
+
+        linhas = progresso.get('linhas', 0)
+        while True:
+            brutas = [linha for _, linha in zip(range(tamanho_bloco), f)]
+            if not brutas:
+                break
+            bloco = pd.read_csv(
+                io.BytesIO(b''.join(brutas)),
+                sep=separador,
+                header=None,
+                names=list(cabecalho),
+                usecols=list(colunas.values()),
+                dtype={colunas['conta']: str}
+            )
+            posicao += sum(len(linha) for linha in brutas)
+            linhas += len(brutas)
+            yield bloco, colunas, {
+                'linhas': linhas,
+                'bytes': posicao,
+                'assinatura': _assinatura_inicio(caminho, posicao)
+            }
+
+
+def _blocos_xlsx(caminho, tamanho_bloco, progresso):
+    """Blocos de linhas ainda não lidas; as já lidas são conferidas pelo hash do conteúdo
+
+    Regravar a planilha com linhas novas muda os bytes do arquivo (é um zip), então
+    a conferência usa os valores das linhas já processadas, e não o arquivo em si.
+    """
+    # O modo read_only do openpyxl lê as linhas sob demanda, sem carregar a planilha inteira
+    try:
+        livro = load_workbook(caminho, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        # Arquivo corrompido ou que não é uma planilha (o .xlsx é um zip com partes fixas)
+        raise _arquivo_ilegivel(caminho, e) from e
+    try:
+        linhas = livro.active.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            raise _arquivo_ilegivel(caminho, 'planilha vazia')
+        cabecalho = list(cabecalho)
+        colunas = _identificar_colunas(cabecalho)
+        posicoes = [cabecalho.index(c) for c in colunas.values()]
+
+        conteudo = hashlib.sha1()
+        lidas = progresso.get('linhas', 0)
+        for _ in range(lidas):
+            conteudo.update(repr(next(linhas, None)).encode('utf-8'))
+        if lidas and conteudo.hexdigest() != progresso['assinatura']:
+            raise _arquivo_substituido(caminho)
+
+        bloco = []
+        for linha in linhas:
+            conteudo.update(repr(linha).encode('utf-8'))
+            bloco.append([linha[i] for i in posicoes])
+            if len(bloco) == tamanho_bloco:
+                lidas += len(bloco)
+                yield pd.DataFrame(bloco, columns=list(colunas.values())), colunas, {
+                    'linhas': lidas, 'assinatura': conteudo.hexdigest()
+                }
+                bloco = []
+        if bloco:
+            lidas += len(bloco)
+            yield pd.DataFrame(bloco, columns=list(colunas.values())), colunas, {
+                'linhas': lidas, 'assinatura': conteudo.hexdigest()
+            }
+    finally:
+        livro.close()
+
+
+class AgregadorLancamentos:
+    def __init__(self, caminho_cubo=ARQUIVO_CUBO):
+        self.caminho_cubo = caminho_cubo
+        self.load_data()
+
+    def load_data(self):
+        """Carrega o cubo e o progresso das ingestões anteriores (ou começa vazio)"""
+        if os.path.exists(self.caminho_cubo):
+            cubo = pd.read_parquet(self.caminho_cubo)
+            self.estado = cubo.attrs.get('estado', {'arquivos': {}, 'descricoes': {}})
+            self.cubo = cubo.set_index(['Código', 'Ano', 'Mes'])['Valor']
+        else:
+            self.estado = {'arquivos': {}, 'descricoes': {}}
+            self.cubo = pd.Series(
+                dtype=float,
+                index=pd.MultiIndex.from_tuples([], names=['Código', 'Ano', 'Mes'])
+            )
+
+    def salvar(self):
+        """Grava cubo e progresso juntos, de forma atômica (arquivo temporário + rename)"""
+        cubo = self.cubo.rename('Valor').reset_index()
+        cubo.attrs['estado'] = self.estado
+        temporario = f"{self.caminho_cubo}.tmp"
+        cubo.to_parquet(temporario, index=False)
+        os.replace(temporario, self.caminho_cubo)
+
+    def _agregar(self, bloco, colunas, primeira_linha):
+        """Soma o bloco por conta e mês; recusa o bloco inteiro se alguma linha não for lida
+
+        Linhas totalmente vazias são ignoradas. Qualquer outra linha com data, conta ou
+        valor ilegível gera ValueError antes de o progresso avançar, para que o arquivo
+        possa ser corrigido e reenviado sem perder lançamentos.
+        """
+        campos = bloco[[colunas['data'], colunas['conta'], colunas['valor']]]
+        vazias = campos.isna().all(axis=1)
+        datas = _datas(bloco[colunas['data']])
+        lancamentos = pd.DataFrame({
+            'Código': bloco[colunas['conta']].astype(str).str.strip().where(bloco[colunas['conta']].notna()),
+            'Ano': datas.dt.year,
+            'Mes': datas.dt.month,
+            'Valor': _numero(bloco[colunas['valor']])
+        })[~vazias]
+
+        invalidas = lancamentos.isna().any(axis=1)
+        if invalidas.any():
+            # Número da linha no arquivo: cabeçalho + linhas anteriores + posição no bloco
+            numeros = [primeira_linha + bloco.index.get_loc(i) + 2 for i in lancamentos.index[invalidas][:5]]
+            raise ValueError(
+                f"{int(invalidas.sum())} lançamento(s) com data, conta ou valor inválido "
+                f"(linhas {', '.join(map(str, numeros))}{'...' if invalidas.sum() > 5 else ''}); "
+                "corrija o arquivo e envie novamente"
+            )
+        lancamentos[['Ano', 'Mes']] = lancamentos[['Ano', 'Mes']].astype(int)
+
+        if 'descricao' in colunas:
+            descricoes = bloco.loc[lancamentos.index, colunas['descricao']].astype(str)
+            ultimas = descricoes.groupby(lancamentos['Código']).last()
+            self.estado['descricoes'].update(ultimas.to_dict())
+
+        return lancamentos.groupby(['Código', 'Ano', 'Mes'])['Valor'].sum()
+
+    def ingerir(self, caminho, tamanho_bloco=TAMANHO_BLOCO, ao_progredir=None):
+        """Soma ao cubo as linhas ainda não processadas do arquivo; retorna quantas foram lidas"""
+        chave = os.path.abspath(caminho)
+        progresso = self.estado['arquivos'].get(chave, {})
+
+        leitor = _blocos_xlsx if caminho.lower().endswith(('.xlsx', '.xlsm')) else _blocos_csv
+        lidas = 0
+        for bloco, colunas, novo_progresso in leitor(caminho, tamanho_bloco, progresso):
+            self.cubo = self.cubo.add(self._agregar(bloco, colunas, progresso.get('linhas', 0)), fill_value=0)
+            progresso = novo_progresso
+            lidas += len(bloco)
+            self.estado['arquivos'][chave] = progresso
+            self.salvar()
+            if ao_progredir:
+                ao_progredir(progresso['linhas'])
+
+        return lidas
+
+    @property
+    def anos(self):
+        return sorted(int(ano) for ano in self.cubo.index.get_level_values('Ano').unique())
+
+    def para_fluxo(self, ano=None):
+        """Cubo de um ano no formato da planilha de fluxo de caixa (Código, Descrição, meses)"""
+        if not self.anos:
+            return pd.DataFrame(columns=['Código', 'Descrição'])
+        ano = ano or self.anos[-1]
+
+        do_ano = self.cubo.xs(ano, level='Ano').unstack('Mes')
+        do_ano.columns = [MESES[mes - 1] for mes in do_ano.columns]
+        do_ano = do_ano.reset_index()
+        do_ano.insert(1, 'Descrição', do_ano['Código'].map(self.estado['descricoes']).fillna(do_ano['Código']))
+        return do_ano
+
+
+@cache_gerenciado
+def carregar_lancamentos(caminho, versao, ano=None):
+    """Cubo de lançamentos no formato do fluxo de caixa; `versao` invalida o cache quando ele muda"""
+    agregador = AgregadorLancamentos(caminho)
+    ano = ano or (agregador.anos[-1] if agregador.anos else None)
+    return agregador.para_fluxo(ano), ano
+
+
+if __name__ == "__main__":
+    agregador = AgregadorLancamentos()
+    for arquivo in sys.argv[1:]:
+        novas = agregador.ingerir(arquivo, ao_progredir=lambda n: print(f"  {n:,} linhas", end='\r'))
+        print(f"{arquivo}: {novas:,} novas linhas")
+    print(f"Cubo: {len(agregador.cubo):,} combinações conta × mês, anos {agregador.anos}")
@@ -1,8 +1,29 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from utils.styles import THEME
+from utils.versao import versao_arquivo
+from utils.cache import cache_gerenciado
+from utils.leitor_excel import ler_excel
+from otimizacao_lotacao import OtimizadorLotacao
+from evolucao_lotacao import EvolucaoLotacao
+
+ARQUIVO_LOTACAO = 'lotacao.xls'
+
+
+@cache_gerenciado
+def carregar_lotacao(caminho, versao):
+    """Lê a planilha de lotação; `versao` invalida o cache quando o arquivo muda"""
+    df = ler_excel(caminho, usecols=['TURMA', 'SALA', 'Capacidade', 'Quantidade_Atual'])
+    df['Unidade'] = df['SALA'].str.split('-').str[0].str.strip()
+    return df
+
+
+@cache_gerenciado
+def figuras_filtro_unidade(_relatorio, versao):
+    """Figuras com todas as unidades embutidas, montadas uma única vez por versão dos dados"""
+    return _relatorio.figuras_filtro_cliente()
+
 
 class RelatorioLotacao:
     def __init__(self):
@@ -16,10 +37,10 @@ class RelatorioLotacao:
     def load_data(self):
         """Carrega e processa os dados iniciais"""
         try:
-            data = pd.read_excel('lotacao.xls')
-            self.df = pd.DataFrame(data)
-            self.df['Unidade'] = self.df['SALA'].str.split('-').str[0].str.strip()
-            self.df_sorted = self.df.sort_values(['Unidade', 'Quantidade_Atual'], ascending=[True, False])
+            self.versao = versao_arquivo(ARQUIVO_LOTACAO)
+            self.df_completo = carregar_lotacao(ARQUIVO_LOTACAO, self.versao)
+            self.df_sorted_completo = self.df_completo.sort_values(['Unidade', 'Quantidade_Atual'], ascending=[True, False])
+            self.aplicar_filtros()
         except Exception as e:
             st.error(f"Erro ao carregar dados: {e}")
 
@@ -56,27 +77,41 @@ class RelatorioLotacao:
         for unidade in self.df['Unidade'].unique():
             self._mostrar_estatisticas_unidade(unidade)
 
+    def calcular_estatisticas_unidade(self, unidade):
+        """Calcula capacidade, ocupação e taxa de ocupação de uma unidade"""
+        dados_unidade = self.df[self.df['Unidade'] == unidade]
+        total_capacidade = int(dados_unidade['Capacidade'].sum())
+        total_atual = int(dados_unidade['Quantidade_Atual'].sum())
+        taxa_ocupacao = (total_atual / total_capacidade) * 100 if total_capacidade > 0 else 0
+
+        return {
+            'unidade': unidade,
+            'capacidade_total': total_capacidade,
+            'ocupacao_total': total_atual,
+            'taxa_ocupacao': taxa_ocupacao
+        }
+
     def _mostrar_estatisticas_unidade(self, unidade):
         """Mostra estatísticas para uma unidade específica"""
         st.markdown(self._get_unidade_header_style(unidade), unsafe_allow_html=True)
 
-        dados_unidade = self.df[self.df['Unidade'] == unidade]
-        total_capacidade = dados_unidade['Capacidade'].sum()
-        total_atual = dados_unidade['Quantidade_Atual'].sum()
-        taxa_ocupacao = (total_atual / total_capacidade) * 100 if total_capacidade > 0 else 0
+        estatisticas = self.calcular_estatisticas_unidade(unidade)
 
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Capacidade Total", f"{total_capacidade}")
+            st.metric("Capacidade Total", f"{estatisticas['capacidade_total']}")
         with col2:
-            st.metric("Ocupação Total", f"{total_atual}")
+            st.metric("Ocupação Total", f"{estatisticas['ocupacao_total']}")
         with col3:
-            st.metric("Taxa de Ocupação", f"{taxa_ocupacao:.1f}%")
+            st.metric("Taxa de Ocupação", f"{estatisticas['taxa_ocupacao']:.1f}%")
 
     def plot_ocupacao_capacidade(self):
         """Plota o gráfico de ocupação vs capacidade"""
         st.markdown(self._get_section_header("Ocupação vs Capacidade por Turma"), unsafe_allow_html=True)
+        st.plotly_chart(self.figura_ocupacao_capacidade(), use_container_width=True)
 
+    def figura_ocupacao_capacidade(self):
+        """Monta o gráfico de ocupação vs capacidade"""
         fig = go.Figure()
 
         for unidade in self.cores_unidades:
@@ -89,7 +124,8 @@ class RelatorioLotacao:
                     y=self.df_sorted[mask]['Capacidade'],
                     marker_color=self.cores_unidades[unidade],
                     opacity=0.25,
-                    offsetgroup=unidade
+                    offsetgroup=unidade,
+                    meta=unidade
                 ))
                 # Barras de Quantidade Atual
                 fig.add_trace(go.Bar(
@@ -98,7 +134,8 @@ class RelatorioLotacao:
                     y=self.df_sorted[mask]['Quantidade_Atual'],
                     marker_color=self.cores_unidades[unidade],
                     opacity=0.85,
-                    offsetgroup=unidade
+                    offsetgroup=unidade,
+                    meta=unidade
                 ))
 
         fig.update_layout(
@@ -128,12 +165,15 @@ class RelatorioLotacao:
             hovermode='x unified'
         )
 
-        st.plotly_chart(fig, use_container_width=True)
+        return fig
 
     def plot_taxa_ocupacao(self):
             """Plota o gráfico de taxa de ocupação"""
             st.markdown(self._get_section_header("Taxa de Ocupação por Turma", size=22), unsafe_allow_html=True)
+            st.plotly_chart(self.figura_taxa_ocupacao(), use_container_width=True)
 
+    def figura_taxa_ocupacao(self):
+            """Monta o gráfico de taxa de ocupação"""
             taxa_ocupacao = (self.df_sorted['Quantidade_Atual'] / self.df_sorted['Capacidade'] * 100)
             
             fig = go.Figure()
@@ -146,17 +186,14 @@ class RelatorioLotacao:
                         x=self.df_sorted[mask]['TURMA'],
                         y=taxa_ocupacao[mask],
                         marker_color=self.cores_unidades[unidade],
-                        opacity=0.85
+                        opacity=0.85,
+                        meta=unidade
                     ))
 
-            # Linha de capacidade máxima
-            fig.add_trace(go.Scatter(
-                x=self.df_sorted['TURMA'],
-                y=[100] * len(self.df_sorted),
-                mode='lines',
-                name='Capacidade Máxima',
-                line=dict(color=THEME['ACCENT2'], dash='dash')
-            ))
+            # Linha de capacidade máxima; como forma do layout, não acrescenta turmas ao eixo x
+            # (um trace com as turmas de todas as unidades vazaria para o filtro de unidade)
+            fig.add_hline(y=100, line_dash='dash', line_color=THEME['ACCENT2'],
+                          annotation_text='Capacidade Máxima', annotation_font_color=THEME['TEXT_COLOR'])
 
             fig.update_layout(
                 paper_bgcolor=THEME['BG_COLOR'],
@@ -184,12 +221,15 @@ class RelatorioLotacao:
                 hovermode='x unified'
             )
 
-            st.plotly_chart(fig, use_container_width=True)
+            return fig
 
     def plot_comparativo_medias(self):
         """Plota o gráfico comparativo de médias"""
         st.markdown(self._get_section_header("Comparativo de Médias por Unidade", size=22), unsafe_allow_html=True)
+        st.plotly_chart(self.figura_comparativo_medias(), use_container_width=True)
 
+    def figura_comparativo_medias(self):
+        """Monta o gráfico comparativo de médias"""
         media_ocupacao = self.df.groupby('Unidade')['Quantidade_Atual'].mean()
         media_capacidade = self.df.groupby('Unidade')['Capacidade'].mean()
         total_ocupacao = self.df.groupby('Unidade')['Quantidade_Atual'].sum()
@@ -206,7 +246,8 @@ class RelatorioLotacao:
                     y=[media_capacidade[unidade]],
                     marker_color=self.cores_unidades[unidade],
                     opacity=0.25,
-                    offsetgroup=unidade
+                    offsetgroup=unidade,
+                    meta=unidade
                 ))
                 # Barra de Ocupação Média
                 fig.add_trace(go.Bar(
@@ -216,6 +257,7 @@ class RelatorioLotacao:
                     marker_color=self.cores_unidades[unidade],
                     opacity=0.85,
                     offsetgroup=unidade,
+                    meta=unidade,
                     text=f'Total: {total_ocupacao[unidade]}/{total_capacidade[unidade]}',
                     textposition='outside'
                 ))
@@ -246,14 +288,118 @@ class RelatorioLotacao:
             hovermode='x unified'
         )
 
-        st.plotly_chart(fig, use_container_width=True)
+        return fig
 
-    def render(self, filtros=None):
-        """Renderiza todo o relatório de lotação"""
+    def adicionar_filtro_unidade(self, fig, coluna_x='TURMA'):
+        """Embute um seletor de unidade na figura; a filtragem acontece no navegador
+
+        Cada trace deve indicar sua unidade em `meta`; traces sem unidade ficam sempre
+        visíveis. O eixo x é restrito às categorias da unidade escolhida, e o título
+        mostra os totais da unidade, que mudam junto com o seletor.
+        """
+        botoes = [dict(
+            label='Todas',
+            method='update',
+            args=[
+                {'visible': [True] * len(fig.data)},
+                {
+                    'xaxis.categoryorder': 'trace',
+                    'xaxis.autorange': True,
+                    'title.text': self._titulo_totais()
+                }
+            ]
+        )]
+
+        for unidade in self.df_sorted['Unidade'].unique():
+            categorias = list(self.df_sorted.loc[self.df_sorted['Unidade'] == unidade, coluna_x].unique())
+            botoes.append(dict(
+                label=unidade,
+                method='update',
+                args=[
+                    {'visible': [trace.meta in (None, unidade) for trace in fig.data]},
+                    {
+                        'xaxis.categoryorder': 'array',
+                        'xaxis.categoryarray': categorias,
+                        'xaxis.range': [-0.5, len(categorias) - 0.5],
+                        'title.text': self._titulo_totais(unidade)
+                    }
+                ]
+            ))
+
+        fig.update_layout(
+            title=dict(text=self._titulo_totais(), x=1, xanchor='right', font=dict(size=14)),
+            margin=dict(t=80)
+        )
+        fig.update_layout(updatemenus=[dict(
+            buttons=botoes,
+            direction='down',
+            x=0,
+            xanchor='left',
+            y=1.15,
+            yanchor='top',
+            bgcolor=THEME['CARD_COLOR'],
+            font=dict(color=THEME['TEXT_COLOR'])
+        )])
+        return fig
+
+    def _titulo_totais(self, unidade=None):
+        """Capacidade, ocupação e taxa de uma unidade (ou de todas) para o título das figuras"""
+        dados = self.df if unidade is None else self.df[self.df['Unidade'] == unidade]
+        capacidade = int(dados['Capacidade'].sum())
+        ocupacao = int(dados['Quantidade_Atual'].sum())
+        taxa = ocupacao / capacidade * 100 if capacidade > 0 else 0
+        return f"{unidade or 'Todas as unidades'} — Capacidade: {capacidade} · Ocupação: {ocupacao} · Taxa: {taxa:.1f}%"
+
+    def figuras_filtro_cliente(self):
+        """Figuras com todas as unidades embutidas e filtro de unidade no navegador"""
+        return (
+            self.adicionar_filtro_unidade(self.figura_ocupacao_capacidade()),
+            self.adicionar_filtro_unidade(self.figura_taxa_ocupacao()),
+            self.adicionar_filtro_unidade(self.figura_comparativo_medias(), coluna_x='Unidade')
+        )
+
+    def render_cliente(self):
+        """Renderiza o relatório com todas as unidades e filtro de unidade feito no navegador"""
         self.show_header()
+        self.aplicar_filtros()
+        self.show_estatisticas()
+        st.caption(
+            "Os cartões acima somam todas as unidades. O seletor de unidade dos gráficos "
+            "filtra apenas os gráficos, e o título de cada um mostra os totais da unidade escolhida."
+        )
+        st.divider()
+
+        fig_ocupacao, fig_taxa, fig_medias = figuras_filtro_unidade(self, self.versao)
+
+        st.markdown(self._get_section_header("Ocupação vs Capacidade por Turma"), unsafe_allow_html=True)
+        st.plotly_chart(fig_ocupacao, use_container_width=True)
+        st.divider()
+        colA, colB = st.columns(2)
+        with colA:
+            st.markdown(self._get_section_header("Taxa de Ocupação por Turma", size=22), unsafe_allow_html=True)
+            st.plotly_chart(fig_taxa, use_container_width=True)
+        with colB:
+            st.markdown(self._get_section_header("Comparativo de Médias por Unidade", size=22), unsafe_allow_html=True)
+            st.plotly_chart(fig_medias, use_container_width=True)
+        st.divider()
+        EvolucaoLotacao().render()
+        st.divider()
+        OtimizadorLotacao(self.df).render()
+        st.caption("A proposta de remanejamento considera todas as unidades, independentemente do seletor dos gráficos.")
+
+    def aplicar_filtros(self, filtros=None):
+        """Define `df` e `df_sorted` a partir dos dados completos, sem acumular filtros anteriores"""
+        self.df = self.df_completo
+        self.df_sorted = self.df_sorted_completo
         if filtros and "unidade" in filtros and filtros["unidade"] != "Todas":
             self.df = self.df[self.df['Unidade'] == filtros["unidade"]]
             self.df_sorted = self.df_sorted[self.df_sorted['Unidade'] == filtros["unidade"]]
+
+    def render(self, filtros=None):
+        """Renderiza todo o relatório de lotação"""
+        self.show_header()
+        # O objeto é reaproveitado entre reruns de fragmento, então o filtro parte sempre do zero
+        self.aplicar_filtros(filtros)
         self.show_estatisticas()
         st.divider()
         self.plot_ocupacao_capacidade()
@@ -263,6 +409,10 @@ class RelatorioLotacao:
             self.plot_taxa_ocupacao()
         with colB:
             self.plot_comparativo_medias()
+        st.divider()
+        EvolucaoLotacao((filtros or {}).get("unidade", "Todas")).render()
+        st.divider()
+        OtimizadorLotacao(self.df).render()
 
     @staticmethod
     def _get_section_header(texto, size=26):
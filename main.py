@@ -1,7 +1,12 @@
+import os
 import streamlit as st
-from financeiro import RelatorioFinanceiro
-from lotacao import RelatorioLotacao
+from financeiro import RelatorioFinanceiro, ARQUIVO_FLUXO, FONTE_PLANILHA, FONTE_LANCAMENTOS
+from lancamentos import AgregadorLancamentos, PASTA_LANCAMENTOS
+from lotacao import RelatorioLotacao, ARQUIVO_LOTACAO, carregar_lotacao
+from historico_lotacao import HistoricoLotacao
 from utils.styles import THEME
+from utils.cache import CACHE
+from utils.versao import versao_arquivo
 
 class DashboardEscolar:
     def __init__(self):
@@ -10,7 +15,7 @@ class DashboardEscolar:
             layout="wide",
             initial_sidebar_state="expanded"
         )
-        self.financeiro = RelatorioFinanceiro()
+        self.financeiro = RelatorioFinanceiro(st.session_state.get('fonte_financeiro', FONTE_PLANILHA))
         self.lotacao = RelatorioLotacao()
         self.sidebar_container = st.sidebar.container()
 
@@ -35,39 +40,127 @@ class DashboardEscolar:
     def run(self):
         self.setup_header()
         self.setup_file_upload()
+        modo_cliente = st.sidebar.toggle(
+            "⚡ Filtrar no navegador",
+            key="modo_cliente",
+            help="Envia todos os meses e unidades uma única vez e filtra sem recarregar a página. "
+                 "Indicado para conexões lentas."
+        )
+        self.mostrar_metricas_cache()
         tab1, tab2 = st.tabs(["📊 Relatório Financeiro", "👥 Relatório de Lotação"])
 
         with tab1:
             # Não mostra sidebar aqui!
             self.clear_sidebar()
-            self.financeiro.render()
+            self.financeiro.render(modo_cliente)
 
         with tab2:
-            st.sidebar.title("Filtros")
-            # Pegue as unidades dinamicamente se quiser:
-            unidades = ["Todas"] + list(self.lotacao.df['Unidade'].unique())
-            unidade = st.sidebar.selectbox(
-                "Filtrar por Unidade",
-                unidades,
-                key="unidade_global"
+            if modo_cliente:
+                self.lotacao.render_cliente()
+            else:
+                self.render_lotacao()
+
+    @st.fragment
+    def render_lotacao(self):
+        """Relatório de lotação com filtro de unidade; trocar a unidade reexecuta só este trecho"""
+        # Widgets de um fragmento não podem ficar na sidebar, por isso o filtro fica no topo da aba
+        unidades = ["Todas"] + list(self.lotacao.df_completo['Unidade'].unique())
+        unidade = st.selectbox(
+            "Filtrar por Unidade",
+            unidades,
+            key="unidade_global"
+        )
+        filtros = {"unidade": unidade}
+        self.lotacao.render(filtros)
+
+    def mostrar_metricas_cache(self):
+        """Mostra o uso do cache compartilhado do processo"""
+        metricas = CACHE.metricas()
+        with st.sidebar.expander("🗄️ Cache"):
+            st.progress(
+                min(metricas['bytes_em_uso'] / metricas['orcamento_bytes'], 1.0),
+                text=f"{metricas['bytes_em_uso'] / 2**20:.1f} de {metricas['orcamento_bytes'] / 2**20:.0f} MB"
             )
-            filtros = {"unidade": unidade}
-            self.lotacao.render(filtros)
+            st.caption(
+                f"Entradas: {metricas['entradas']} · Acertos: {metricas['taxa_acerto']:.0%} · "
+                f"Descartes: {metricas['descartes']}"
+            )
+
+    def upload_lancamentos(self):
+        """Upload de arquivos de lançamentos, somados ao cubo mensal em blocos"""
+        arquivos = st.sidebar.file_uploader(
+            "Upload Lançamentos (CSV ou XLSX)",
+            type=['csv', 'xlsx'],
+            accept_multiple_files=True,
+            key='lancamentos_files',
+            help="Colunas data, conta, valor e (opcional) descrição. Reenviar um arquivo "
+                 "com novos lançamentos no fim processa só as linhas novas."
+        )
+        ingeridos = st.session_state.setdefault('lancamentos_file_ids', set())
+        novos = [arquivo for arquivo in arquivos if arquivo.file_id not in ingeridos]
+        if not novos:
+            return
+
+        os.makedirs(PASTA_LANCAMENTOS, exist_ok=True)
+        agregador = AgregadorLancamentos()
+        for arquivo in novos:
+            caminho = os.path.join(PASTA_LANCAMENTOS, os.path.basename(arquivo.name))
+            with open(caminho, 'wb') as f:
+                f.write(arquivo.getbuffer())
+            with st.sidebar.status(f"Processando {arquivo.name}...") as status:
+                try:
+                    lidas = agregador.ingerir(
+                        caminho,
+                        ao_progredir=lambda n: status.update(label=f"{arquivo.name}: {n:,} linhas")
+                    )
+                except ValueError as e:
+                    status.update(label=f"{arquivo.name}: {e}", state='error')
+                    continue
+                status.update(label=f"✅ {arquivo.name}: {lidas:,} novas linhas", state='complete')
+            ingeridos.add(arquivo.file_id)
+
+        # O relatório foi montado com o cubo anterior à ingestão
+        self.financeiro.load_data()
+        self.financeiro.process_data()
+
+    def registrar_historico_lotacao(self):
+        """Acrescenta ao histórico de lotação as turmas que mudaram com o novo upload"""
+        try:
+            df_lotacao = carregar_lotacao(ARQUIVO_LOTACAO, versao_arquivo(ARQUIVO_LOTACAO))
+            alteradas = HistoricoLotacao().registrar(df_lotacao)
+        except Exception as e:
+            st.sidebar.warning(f"Histórico de lotação não atualizado: {e}")
+            return
+        if alteradas:
+            st.sidebar.caption(f"📈 {alteradas} turma(s) com mudança registrada(s) no histórico")
 
     def setup_file_upload(self):
         """Sistema de upload de arquivos"""
         st.sidebar.title("📁 Gerenciar Arquivos")
-        
-        # Upload do arquivo financeiro
-        uploaded_finance = st.sidebar.file_uploader(
-            "Upload Fluxo de Caixa", 
-            type=['xlsx', 'xls'],
-            key='finance_file'
+
+        fonte = st.sidebar.radio(
+            "Dados financeiros",
+            [FONTE_PLANILHA, FONTE_LANCAMENTOS],
+            key='fonte_financeiro',
+            horizontal=True
         )
+        if fonte == FONTE_LANCAMENTOS:
+            self.upload_lancamentos()
+            uploaded_finance = None
+        else:
+            # Upload do arquivo financeiro
+            uploaded_finance = st.sidebar.file_uploader(
+                "Upload Fluxo de Caixa",
+                type=['xlsx', 'xls'],
+                key='finance_file'
+            )
         
         if uploaded_finance:
-            with open('fluxo_de_caixa.xlsx', 'wb') as f:
-                f.write(uploaded_finance.getbuffer())
+            # Regravar o mesmo upload a cada rerun mudaria a versão do arquivo e invalidaria o cache
+            if st.session_state.get('finance_file_id') != uploaded_finance.file_id:
+                with open(ARQUIVO_FLUXO, 'wb') as f:
+                    f.write(uploaded_finance.getbuffer())
+                st.session_state['finance_file_id'] = uploaded_finance.file_id
             st.sidebar.success("✅ Arquivo financeiro carregado!")
         
         # Upload do arquivo de lotação
@@ -78,8 +171,11 @@ class DashboardEscolar:
         )
         
         if uploaded_lotacao:
-            with open('lotacao.xls', 'wb') as f:
-                f.write(uploaded_lotacao.getbuffer())
+            if st.session_state.get('lotacao_file_id') != uploaded_lotacao.file_id:
+                with open(ARQUIVO_LOTACAO, 'wb') as f:
+                    f.write(uploaded_lotacao.getbuffer())
+                st.session_state['lotacao_file_id'] = uploaded_lotacao.file_id
+                self.registrar_historico_lotacao()
             st.sidebar.success("✅ Arquivo de lotação carregado!")
 
 
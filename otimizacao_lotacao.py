@@ -0,0 +1,261 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
+from scipy import sparse
+from scipy.optimize import milp, LinearConstraint, Bounds
+from utils.styles import THEME
+from utils.cache import cache_gerenciado
+
+# Pesos da função objetivo: exceder a capacidade é sempre pior que se afastar da meta
+PESO_EXCESSO = 10.0
+PESO_DESVIO_META = 1.0
+CUSTO_MOVIMENTO = 0.5
+CUSTO_ENTRE_UNIDADES = 1.0
+
+
+def serie_da_turma(turmas):
+    """Extrai a série da turma ('1º ano A' -> '1º ano'); turmas da mesma série são compatíveis"""
+    return turmas.astype(str).str.strip().str.replace(r'\s+\S$', '', regex=True)
+
+
+def _parear(envios, recebimentos):
+    """Casa listas de (índice, quantidade) de saída e de entrada, retornando os movimentos e as sobras"""
+    movimentos = []
+    envios = [list(item) for item in envios]
+    recebimentos = [list(item) for item in recebimentos]
+    i = j = 0
+    while i < len(envios) and j < len(recebimentos):
+        quantidade = min(envios[i][1], recebimentos[j][1])
+        movimentos.append((envios[i][0], recebimentos[j][0], quantidade))
+        envios[i][1] -= quantidade
+        recebimentos[j][1] -= quantidade
+        if envios[i][1] == 0:
+            i += 1
+        if recebimentos[j][1] == 0:
+            j += 1
+    sobra_envios = [item for item in envios[i:] if item[1] > 0]
+    sobra_recebimentos = [item for item in recebimentos[j:] if item[1] > 0]
+    return movimentos, sobra_envios, sobra_recebimentos
+
+
+@cache_gerenciado
+def otimizar_lotacao(df, alvo=0.9, permitir_entre_unidades=True):
+    """Propõe remanejamentos de alunos entre turmas compatíveis para eliminar excessos e aproximar a meta
+
+    O problema é modelado como um fluxo de custo mínimo inteiro: cada turma envia ou
+    recebe alunos por meio de um "pool" da sua unidade e série, e os pools de uma
+    mesma série trocam alunos entre unidades com custo adicional. Assim o número de
+    variáveis cresce linearmente com o número de turmas, e não com os pares de turmas.
+
+    Retorna (movimentos, turmas), onde `turmas` traz a coluna 'Quantidade_Proposta'.
+    """
+    turmas = df[['Unidade', 'SALA', 'TURMA', 'Capacidade', 'Quantidade_Atual']].reset_index(drop=True).copy()
+    turmas['Serie'] = serie_da_turma(turmas['TURMA'])
+    colunas_movimentos = ['Série', 'Unidade_Origem', 'Turma_Origem', 'Unidade_Destino', 'Turma_Destino', 'Alunos']
+    if turmas.empty:
+        turmas['Quantidade_Proposta'] = turmas['Quantidade_Atual']
+        return pd.DataFrame(columns=colunas_movimentos), turmas
+
+    n = len(turmas)
+    quantidade = turmas['Quantidade_Atual'].to_numpy(dtype=float)
+    capacidade = turmas['Capacidade'].to_numpy(dtype=float)
+    meta = np.round(alvo * capacidade)
+
+    grupo = turmas.groupby(['Unidade', 'Serie'], sort=False).ngroup().to_numpy()
+    m = grupo.max() + 1
+    serie_grupo = (
+        turmas.assign(grupo=grupo).drop_duplicates('grupo').sort_values('grupo')['Serie']
+    )
+    serie_codigo = pd.factorize(serie_grupo)[0]
+    k = serie_codigo.max() + 1
+
+    # Variáveis: saída s, entrada r, excesso o, desvio d (n cada), envio e recebimento entre unidades (m cada)
+    S, R, O, D = (np.arange(n) + i * n for i in range(4))
+    EO, EI = 4 * n + np.arange(m), 4 * n + m + np.arange(m)
+    n_var = 4 * n + 2 * m
+
+    c = np.zeros(n_var)
+    c[S] = CUSTO_MOVIMENTO
+    c[O] = PESO_EXCESSO
+    c[D] = PESO_DESVIO_META
+    c[EO] = CUSTO_ENTRE_UNIDADES
+
+    linhas = np.arange(n)
+    um = np.ones(n)
+
+    # Excesso:  -s + r - o <= cap - q
+    # Desvio:   -s + r - d <= meta - q   e   s - r - d <= q - meta
+    desigualdades = sparse.vstack([
+        sparse.coo_matrix((np.concatenate([-um, um, -um]), (np.tile(linhas, 3), np.concatenate([S, R, O]))), shape=(n, n_var)),
+        sparse.coo_matrix((np.concatenate([-um, um, -um]), (np.tile(linhas, 3), np.concatenate([S, R, D]))), shape=(n, n_var)),
+        sparse.coo_matrix((np.concatenate([um, -um, -um]), (np.tile(linhas, 3), np.concatenate([S, R, D]))), shape=(n, n_var)),
+    ]).tocsr()
+    limite_superior = np.concatenate([capacidade - quantidade, meta - quantidade, quantidade - meta])
+
+    # Conservação por unidade/série:  sum(s - r) - envio + recebimento = 0
+    # Conservação por série:          sum(envio - recebimento) = 0
+    um_m = np.ones(m)
+    igualdades = sparse.vstack([
+        sparse.coo_matrix(
+            (np.concatenate([um, -um, -um_m, um_m]),
+             (np.concatenate([grupo, grupo, np.arange(m), np.arange(m)]), np.concatenate([S, R, EO, EI]))),
+            shape=(m, n_var)
+        ),
+        sparse.coo_matrix(
+            (np.concatenate([um_m, -um_m]), (np.concatenate([serie_codigo, serie_codigo]), np.concatenate([EO, EI]))),
+            shape=(k, n_var)
+        ),
+    ]).tocsr()
+
+    superior = np.full(n_var, np.inf)
+    superior[S] = quantidade
+    if not permitir_entre_unidades:
+        superior[EO] = 0
+        superior[EI] = 0
+
+    integralidade = np.zeros(n_var)
+    integralidade[np.concatenate([S, R, EO, EI])] = 1
+
+    resultado = milp(
+        c,
+        integrality=integralidade,
+        bounds=Bounds(np.zeros(n_var), superior),
+        constraints=[
+            LinearConstraint(desigualdades, -np.inf, limite_superior),
+            LinearConstraint(igualdades, 0, 0)
+        ]
+    )
+    if not resultado.success:
+        raise RuntimeError(f"Otimização de lotação falhou: {resultado.message}")
+
+    saidas = np.round(resultado.x[S]).astype(int)
+    entradas = np.round(resultado.x[R]).astype(int)
+    turmas['Quantidade_Proposta'] = turmas['Quantidade_Atual'] - saidas + entradas
+
+    # Decompõe o fluxo em movimentos: primeiro dentro da unidade, depois entre unidades
+    pares = []
+    sobras = {}
+    for g in np.unique(np.concatenate([grupo[saidas > 0], grupo[entradas > 0]])):
+        envios = [(i, saidas[i]) for i in np.flatnonzero((grupo == g) & (saidas > 0))]
+        recebimentos = [(i, entradas[i]) for i in np.flatnonzero((grupo == g) & (entradas > 0))]
+        movimentos, sobra_envios, sobra_recebimentos = _parear(envios, recebimentos)
+        pares.extend(movimentos)
+        envios_serie, recebimentos_serie = sobras.setdefault(serie_codigo[g], ([], []))
+        envios_serie.extend(sobra_envios)
+        recebimentos_serie.extend(sobra_recebimentos)
+
+    for envios, recebimentos in sobras.values():
+        pares.extend(_parear(envios, recebimentos)[0])
+
+    origem = [p[0] for p in pares]
+    destino = [p[1] for p in pares]
+    movimentos = pd.DataFrame(dict(zip(colunas_movimentos, [
+        turmas['Serie'].to_numpy()[origem],
+        turmas['Unidade'].to_numpy()[origem],
+        turmas['TURMA'].to_numpy()[origem],
+        turmas['Unidade'].to_numpy()[destino],
+        turmas['TURMA'].to_numpy()[destino],
+        [int(p[2]) for p in pares]
+    ])))
+
+    return movimentos, turmas
+
+
+class OtimizadorLotacao:
+    def __init__(self, df):
+        self.df = df
+
+    def plot_antes_depois(self, turmas, alvo):
+        """Plota a taxa de ocupação atual e a proposta por turma"""
+        rotulos = turmas['Unidade'] + ' · ' + turmas['TURMA']
+        taxa_atual = turmas['Quantidade_Atual'] / turmas['Capacidade'] * 100
+        taxa_proposta = turmas['Quantidade_Proposta'] / turmas['Capacidade'] * 100
+
+        fig = go.Figure()
+        fig.add_trace(go.Bar(
+            name='Atual',
+            x=rotulos,
+            y=taxa_atual,
+            marker_color=THEME['PRIMARY_BLUE'],
+            opacity=0.45
+        ))
+        fig.add_trace(go.Bar(
+            name='Proposta',
+            x=rotulos,
+            y=taxa_proposta,
+            marker_color=THEME['PRIMARY_GREEN'],
+            opacity=0.9
+        ))
+
+        fig.add_hline(y=100, line_dash='dash', line_color=THEME['ACCENT2'],
+                      annotation_text='Capacidade Máxima', annotation_font_color=THEME['TEXT_COLOR'])
+        fig.add_hline(y=alvo * 100, line_dash='dot', line_color=THEME['ACCENT1'],
+                      annotation_text='Meta', annotation_font_color=THEME['TEXT_COLOR'])
+
+        fig.update_layout(
+            barmode='group',
+            paper_bgcolor=THEME['BG_COLOR'],
+            plot_bgcolor=THEME['BG_COLOR'],
+            font=dict(color=THEME['TEXT_COLOR']),
+            legend=dict(
+                bgcolor=THEME['CARD_COLOR'],
+                font=dict(color=THEME['TEXT_COLOR'])
+            ),
+            xaxis=dict(
+                showgrid=True,
+                gridcolor=THEME['CARD_COLOR'],
+                gridwidth=0.1,
+                tickfont=dict(color=THEME['TEXT_COLOR']),
+                tickangle=45
+            ),
+            yaxis=dict(
+                title='Taxa de Ocupação (%)',
+                showgrid=True,
+                gridcolor=THEME['CARD_COLOR'],
+                gridwidth=0.1,
+                tickfont=dict(color=THEME['TEXT_COLOR'])
+            ),
+            margin=dict(l=20, r=20, t=40, b=100),
+            hovermode='x unified'
+        )
+
+        st.plotly_chart(fig, use_container_width=True)
+
+    def render(self):
+        """Renderiza a proposta de remanejamento"""
+        st.markdown(f"<h2 style='color:{THEME['TEXT_COLOR']};'>Proposta de Remanejamento</h2>", unsafe_allow_html=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            alvo = st.slider("Meta de ocupação (%)", 50, 100, 90, step=5, key="meta_ocupacao") / 100
+        with col2:
+            permitir_entre_unidades = st.checkbox(
+                "Permitir remanejamento entre unidades",
+                value=True,
+                key="remanejar_entre_unidades"
+            )
+
+        try:
+            movimentos, turmas = otimizar_lotacao(self.df, alvo, permitir_entre_unidades)
+        except RuntimeError as e:
+            st.error(str(e))
+            return
+
+        excesso_atual = (turmas['Quantidade_Atual'] - turmas['Capacidade']).clip(lower=0).sum()
+        excesso_proposto = (turmas['Quantidade_Proposta'] - turmas['Capacidade']).clip(lower=0).sum()
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Alunos Acima da Capacidade", f"{excesso_proposto}", delta=f"{excesso_proposto - excesso_atual}", delta_color="inverse")
+        with col2:
+            st.metric("Alunos Remanejados", f"{int(movimentos['Alunos'].sum())}")
+        with col3:
+            st.metric("Movimentos Propostos", f"{len(movimentos)}")
+
+        self.plot_antes_depois(turmas, alvo)
+
+        if movimentos.empty:
+            st.info("Nenhum remanejamento necessário para a meta escolhida.")
+        else:
+            st.dataframe(movimentos, use_container_width=True, hide_index=True)
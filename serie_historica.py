@@ -0,0 +1,206 @@
+import os
+import pandas as pd
+import numpy as np
+from utils.cache import cache_gerenciado
+from utils.versao import versao_arquivo
+
+ARQUIVO_HISTORICO = 'historico_fluxo.parquet'
+
+MESES = [
+    'Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
+    'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'
+]
+
+COLUNAS = ['Tipo', 'Categoria', 'Ano', 'Mes', 'Valor']
+
+
+def _variacao(atual, anterior):
+    """Variação percentual sobre o módulo do valor anterior (despesas são negativas)"""
+    return ((atual - anterior) / anterior.abs().replace(0, np.nan) * 100).round(2)
+
+
+class SerieHistorica:
+    """Armazena valores por (categoria, ano, mês) com um índice pré-calculado
+
+    Os valores ficam em uma matriz densa categoria × período (meses consecutivos),
+    com somas acumuladas ao longo do tempo. Janelas móveis e acumulados do ano
+    saem da diferença de duas posições das somas acumuladas, sem recalcular nada.
+    Uma contagem acumulada dos meses presentes no histórico diz, do mesmo jeito, se
+    a janela está completa; meses que faltam não entram como zero.
+    """
+
+    def __init__(self, registros=None):
+        self.registros = registros if registros is not None else pd.DataFrame(columns=COLUNAS)
+        self.construir_indice()
+
+    @classmethod
+    def carregar(cls, caminho=ARQUIVO_HISTORICO):
+        """Carrega o histórico salvo, ou um histórico vazio se o arquivo não existir"""
+        if not os.path.exists(caminho):
+            return cls()
+        return cls(pd.read_parquet(caminho))
+
+    def salvar(self, caminho=ARQUIVO_HISTORICO):
+        self.registros.to_parquet(caminho, index=False)
+
+    def registrar(self, df_fluxo, ano):
+        """Retorna um novo histórico com as receitas e despesas da planilha gravadas no `ano` informado"""
+        meses_df = [col for col in df_fluxo.columns if col in MESES]
+        codigo = df_fluxo['Código'].astype(str)
+        descricao = df_fluxo['Descrição']
+
+        # Mesmo critério de categorias do ComparativoCrescimento (sem os totalizadores)
+        tipo = np.select(
+            [
+                codigo.str.startswith('1') & ~descricao.str.contains('RECEITAS', na=False, case=False),
+                codigo.str.startswith('2') & ~descricao.str.contains('DESPESAS', na=False, case=False)
+            ],
+            ['Receita', 'Despesa'],
+            default=''
+        )
+
+        novos = (
+            df_fluxo.assign(Tipo=tipo, Categoria=descricao)[lambda d: d['Tipo'] != '']
+            .melt(id_vars=['Tipo', 'Categoria'], value_vars=meses_df, var_name='Mes', value_name='Valor')
+        )
+        novos['Valor'] = pd.to_numeric(novos['Valor'], errors='coerce')
+        novos = novos.dropna(subset=['Valor'])
+        novos['Mes'] = novos['Mes'].map(MESES.index) + 1
+        novos['Ano'] = int(ano)
+        novos = novos.groupby(['Tipo', 'Categoria', 'Ano', 'Mes'], as_index=False)['Valor'].sum()
+
+        # Substitui o que já existia para o ano (reenvio da mesma planilha)
+        anteriores = self.registros[self.registros['Ano'] != int(ano)]
+        return SerieHistorica(pd.concat([anteriores, novos[COLUNAS]], ignore_index=True))
+
+    def construir_indice(self):
+        """Monta a matriz categoria × período e as somas acumuladas"""
+        registros = self.registros
+        self.categorias = pd.MultiIndex.from_frame(
+            registros[['Tipo', 'Categoria']].drop_duplicates().sort_values(['Tipo', 'Categoria'])
+        ) if not registros.empty else pd.MultiIndex.from_tuples([], names=['Tipo', 'Categoria'])
+
+        if registros.empty:
+            self.inicio = self.fim = 0
+            self.valores = np.zeros((0, 0))
+            self.presente = np.zeros((0, 0), dtype=bool)
+            self.acumulado = np.zeros((0, 1))
+            self.meses_cobertos = np.zeros(1, dtype=int)
+            return
+
+        periodo = registros['Ano'].astype(int).to_numpy() * 12 + registros['Mes'].astype(int).to_numpy() - 1
+        self.inicio, self.fim = periodo.min(), periodo.max()
+
+        linhas = self.categorias.get_indexer(pd.MultiIndex.from_frame(registros[['Tipo', 'Categoria']]))
+        colunas = periodo - self.inicio
+        self.valores = np.zeros((len(self.categorias), self.fim - self.inicio + 1))
+        self.presente = np.zeros(self.valores.shape, dtype=bool)
+        np.add.at(self.valores, (linhas, colunas), registros['Valor'].to_numpy(dtype=float))
+        self.presente[linhas, colunas] = True
+
+        # acumulado[:, t] = soma dos períodos anteriores a t
+        self.acumulado = np.concatenate(
+            [np.zeros((len(self.categorias), 1)), np.cumsum(self.valores, axis=1)], axis=1
+        )
+        # meses_cobertos[t] = quantos períodos anteriores a t têm algum registro no histórico
+        self.meses_cobertos = np.concatenate([[0], np.cumsum(self.presente.any(axis=0))])
+
+    @property
+    def anos(self):
+        return sorted(int(ano) for ano in self.registros['Ano'].unique())
+
+    def meses_do_ano(self, ano):
+        return sorted(int(mes) for mes in self.registros.loc[self.registros['Ano'] == ano, 'Mes'].unique())
+
+    def _posicao(self, ano, mes):
+        return int(ano) * 12 + int(mes) - 1 - self.inicio
+
+    def _soma(self, de, ate):
+        """Soma dos períodos [de, ate] de todas as categorias; NaN se falta algum mês da janela"""
+        if de < 0 or ate >= self.valores.shape[1]:
+            return np.full(len(self.categorias), np.nan)
+        if self.meses_cobertos[ate + 1] - self.meses_cobertos[de] < ate - de + 1:
+            return np.full(len(self.categorias), np.nan)
+        return self.acumulado[:, ate + 1] - self.acumulado[:, de]
+
+    def _valor(self, posicao):
+        if posicao < 0 or posicao >= self.valores.shape[1]:
+            return np.full(len(self.categorias), np.nan)
+        return np.where(self.presente[:, posicao], self.valores[:, posicao], np.nan)
+
+    def resumo(self, ano, mes):
+        """Comparativo ano contra ano de todas as categorias em (ano, mês)"""
+        t = self._posicao(ano, mes)
+        inicio_ano = self._posicao(ano, 1)
+
+        resumo = pd.DataFrame({
+            'Valor': self._valor(t),
+            'Valor_Ano_Anterior': self._valor(t - 12),
+            'Acumulado_12m': self._soma(t - 11, t),
+            'Acumulado_12m_Anterior': self._soma(t - 23, t - 12),
+            'YTD': self._soma(inicio_ano, t),
+            'YTD_Anterior': self._soma(inicio_ano - 12, t - 12)
+        }, index=self.categorias)
+
+        resumo['YoY_%'] = _variacao(resumo['Valor'], resumo['Valor_Ano_Anterior'])
+        resumo['Acumulado_12m_%'] = _variacao(resumo['Acumulado_12m'], resumo['Acumulado_12m_Anterior'])
+        resumo['YTD_%'] = _variacao(resumo['YTD'], resumo['YTD_Anterior'])
+
+        return resumo.reset_index()
+
+    def totais(self, ano, mes):
+        """Mesmo comparativo do `resumo`, somado por tipo, com uma linha de lucro"""
+        colunas = ['Valor', 'Valor_Ano_Anterior', 'Acumulado_12m', 'Acumulado_12m_Anterior', 'YTD', 'YTD_Anterior']
+        totais = self.resumo(ano, mes).groupby('Tipo')[colunas].sum(min_count=1)
+        totais = totais.reindex(['Receita', 'Despesa'])
+        totais.loc['Lucro'] = totais.loc['Receita'] + totais.loc['Despesa']
+
+        totais['YoY_%'] = _variacao(totais['Valor'], totais['Valor_Ano_Anterior'])
+        totais['Acumulado_12m_%'] = _variacao(totais['Acumulado_12m'], totais['Acumulado_12m_Anterior'])
+        totais['YTD_%'] = _variacao(totais['YTD'], totais['YTD_Anterior'])
+        return totais
+
+    def quadro(self):
+        """Matriz categoria × período como DataFrame, e a posição de cada período no ano
+
+        O quadro tem as colunas 'Tipo', 'Descrição' e uma coluna 'Mês/Ano' por período
+        (meses ausentes do histórico ficam NaN), no formato de `detectar_anomalias`.
+        """
+        periodos = np.arange(self.inicio, self.fim + 1) if len(self.categorias) else np.arange(0)
+        quadro = pd.DataFrame(
+            np.where(self.presente, self.valores, np.nan),
+            columns=[f"{MESES[p % 12]}/{p // 12}" for p in periodos]
+        )
+        quadro.insert(0, 'Tipo', self.categorias.get_level_values('Tipo'))
+        quadro.insert(1, 'Descrição', self.categorias.get_level_values('Categoria'))
+        return quadro, tuple(int(p % 12) for p in periodos)
+
+    def serie(self, tipo=None, categoria=None):
+        """Série mensal (Ano, Mes, Valor) de uma categoria, de um tipo ou do total"""
+        mascara = np.ones(len(self.categorias), dtype=bool)
+        if tipo:
+            mascara &= self.categorias.get_level_values('Tipo') == tipo
+        if categoria:
+            mascara &= self.categorias.get_level_values('Categoria') == categoria
+
+        periodos = np.arange(self.inicio, self.fim + 1)
+        presente = self.presente[mascara].any(axis=0) if mascara.any() else np.zeros(len(periodos), dtype=bool)
+        return pd.DataFrame({
+            'Ano': periodos // 12,
+            'Mes': periodos % 12 + 1,
+            'Valor': self.valores[mascara].sum(axis=0)
+        })[presente].reset_index(drop=True)
+
+
+@cache_gerenciado
+def carregar_historico(caminho, versao):
+    """Carrega o histórico; `versao` invalida o cache quando o arquivo muda"""
+    return SerieHistorica.carregar(caminho)
+
+
+def historico_salvo(caminho=ARQUIVO_HISTORICO):
+    """Histórico salvo, pelo cache (vazio se ainda não houver nenhum)"""
+    try:
+        return carregar_historico(caminho, versao_arquivo(caminho))
+    except FileNotFoundError:
+        return SerieHistorica()
@@ -0,0 +1,8 @@
+"""Dashboard e API JSON no mesmo processo ASGI, compartilhando o cache do Streamlit
+
+    uvicorn servidor:app --port 8501
+"""
+import streamlit as st
+from api import ROTAS
+
+app = st.App("main.py", routes=ROTAS)
@@ -0,0 +1,292 @@
+"""Teste de carga do dashboard com sessões simultâneas (Streamlit AppTest, sem navegador)
+
+Gera dados sintéticos do tamanho desejado em uma pasta temporária, abre N sessões
+do `main.py` em threads (como o servidor do Streamlit faz) e executa em cada uma um
+roteiro de interações. Ao final, mostra os percentis de latência dos reruns por
+interação, o tempo de CPU e a memória (RSS) do processo, totais e em média por sessão.
+
+    python teste_carga.py --sessoes 10 --interacoes 20 --categorias 200 --turmas 300
+
+Trocar de aba não dispara rerun no Streamlit (é feito no navegador), por isso o
+roteiro usa "recarregar" para representar a abertura/atualização da página.
+
+Limitações (repetidas na saída do teste):
+
+- `AppTest.run()` sempre reexecuta o `main.py` inteiro. No servidor real, trocar o
+  mês, a unidade ou as categorias reexecuta só o fragmento (`st.fragment`) da
+  seção, então a latência dessas interações aqui é a de um rerun completo e não
+  mostra o ganho dos fragmentos.
+- CPU e RSS são do processo inteiro; os valores "por sessão" são o total dividido
+  pelo número de sessões, não uma medição de cada sessão.
+- As sessões simuladas compartilham o mesmo runtime do Streamlit (um único
+  `Runtime._instance` por processo), diferente de conexões separadas a um servidor.
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import resource
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, DIRETORIO)
+
+from streamlit.testing.v1 import AppTest
+from financeiro import ARQUIVO_FLUXO
+from lotacao import ARQUIVO_LOTACAO
+
+MESES = [
+    'Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
+    'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'
+]
+
+# Peso de cada interação no roteiro das sessões
+ROTEIRO_PADRAO = {
+    'mudar_mes': 4,
+    'mudar_unidade': 3,
+    'mudar_categorias': 2,
+    'recarregar': 2,
+    'upload': 1
+}
+
+# Interações que no servidor real reexecutam só um fragmento, mas aqui reexecutam o script inteiro
+INTERACOES_FRAGMENTO = {'mudar_mes', 'mudar_unidade', 'mudar_categorias'}
+
+
+def gerar_fluxo(n_categorias, n_meses, ano=2025, semente=0):
+    """Planilha de fluxo de caixa sintética, no mesmo layout da original (título + 3 linhas)"""
+    rng = np.random.default_rng(semente)
+    meses = MESES[:n_meses]
+    n_receitas = n_categorias // 2
+    n_despesas = n_categorias - n_receitas
+
+    receitas = rng.gamma(2.0, 20000, (n_receitas, 1)) * rng.normal(1, 0.1, (n_receitas, n_meses))
+    despesas = -rng.gamma(2.0, 15000, (n_despesas, 1)) * rng.normal(1, 0.1, (n_despesas, n_meses))
+
+    linhas = [[100000, 'RECEITAS'] + list(receitas.sum(axis=0))]
+    linhas += [[110000 + i, f'RECEITA {i}'] + list(v) for i, v in enumerate(receitas)]
+    linhas += [[200000, 'DESPESAS'] + list(despesas.sum(axis=0))]
+    linhas += [[201000 + i, f'DESPESA {i}'] + list(v) for i, v in enumerate(despesas)]
+    df = pd.DataFrame(linhas, columns=['Código', 'Descrição'] + meses)
+    df.insert(2, 'Valor total', df[meses].sum(axis=1))
+
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, startrow=3)
+        writer.sheets['Sheet1']['A1'] = f'Fluxo de caixa {ano}'
+    return buffer.getvalue()
+
+
+def gerar_lotacao(n_turmas, n_unidades=3, semente=0):
+    """Planilha de lotação sintética com as colunas usadas pelo dashboard"""
+    rng = np.random.default_rng(semente)
+    unidades = rng.integers(1, n_unidades + 1, n_turmas)
+    series = rng.integers(1, 10, n_turmas)
+    capacidade = rng.integers(15, 30, n_turmas)
+    df = pd.DataFrame({
+        'Índice': np.arange(1, n_turmas + 1),
+        'UNIDADE': 'Sintética',
+        'CODUNID': 1,
+        'TURMA': [f'{s}º ano {chr(65 + i % 26)}{i // 26 or ""}' for i, s in enumerate(series)],
+        'SALA': [f'Unid. {u} - Sala {i % 20 + 1}' for i, u in enumerate(unidades)],
+        'Capacidade': capacidade,
+        'Quantidade_Atual': (capacidade * rng.uniform(0.3, 1.2, n_turmas)).astype(int)
+    })
+
+    # O leitor do pandas identifica o formato pelo conteúdo, então o .xls pode ser xlsx
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False, engine='openpyxl')
+    return buffer.getvalue()
+
+
+def tempo_cpu():
+    """CPU (usuário + sistema) consumida pelo processo até agora, em segundos
+
+    Os scripts rodam em threads do Streamlit, e não na thread da sessão simulada,
+    então o consumo é medido no processo e dividido pelo número de sessões.
+    """
+    uso = resource.getrusage(resource.RUSAGE_SELF)
+    return uso.ru_utime + uso.ru_stime
+
+
+def rss_atual():
+    """Memória residente do processo em bytes (Linux), ou o pico se /proc não existir"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MonitorMemoria(threading.Thread):
+    """Amostra o RSS do processo em segundo plano para registrar o pico"""
+
+    def __init__(self, intervalo=0.1):
+        super().__init__(daemon=True)
+        self.intervalo = intervalo
+        self.pico = rss_atual()
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            self.pico = max(self.pico, rss_atual())
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+
+class SessaoSimulada:
+    """Uma sessão de coordenador executando um roteiro aleatório (mas reproduzível)"""
+
+    def __init__(self, numero, roteiro, interacoes, upload_lotacao, timeout):
+        self.numero = numero
+        self.rng = random.Random(numero)
+        self.acoes = self.rng.choices(list(roteiro), weights=list(roteiro.values()), k=interacoes)
+        self.upload_lotacao = upload_lotacao
+        self.timeout = timeout
+        self.medicoes = []
+
+    def _executar(self, acao):
+        at = self.at
+        if acao == 'mudar_mes':
+            seletor = at.selectbox(key='mes_visao_geral')
+            seletor.set_value(self.rng.choice(seletor.options))
+        elif acao == 'mudar_unidade':
+            seletor = at.selectbox(key='unidade_global')
+            seletor.set_value(self.rng.choice(seletor.options))
+        elif acao == 'mudar_categorias':
+            seletor = at.multiselect[0]
+            seletor.set_value(self.rng.sample(seletor.options, k=min(3, len(seletor.options))))
+        elif acao == 'upload':
+            at.file_uploader(key='lotacao_file').set_value(
+                (ARQUIVO_LOTACAO, self.upload_lotacao, 'application/vnd.ms-excel')
+            )
+        at.run(timeout=self.timeout)
+
+    def _medir(self, acao, funcao):
+        inicio = time.perf_counter()
+        funcao()
+        self.medicoes.append({
+            'sessao': self.numero,
+            'acao': acao,
+            'latencia_s': time.perf_counter() - inicio,
+            'erros': len(self.at.exception)
+        })
+
+    def executar(self):
+        self.at = AppTest.from_file(os.path.join(DIRETORIO, 'main.py'), default_timeout=self.timeout)
+        self._medir('abrir', self.at.run)
+        for acao in self.acoes:
+            self._medir(acao, lambda: self._executar(acao))
+        return self.medicoes
+
+
+def executar_teste(sessoes, interacoes, categorias, meses, turmas, roteiro=None, timeout=120):
+    """Executa o teste de carga e retorna (medições, resumo de CPU, memória e vazão)"""
+    roteiro = roteiro or ROTEIRO_PADRAO
+    upload_lotacao = gerar_lotacao(turmas, semente=1)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        diretorio_original = os.getcwd()
+        os.chdir(pasta)
+        try:
+            with open(ARQUIVO_FLUXO, 'wb') as f:
+                f.write(gerar_fluxo(categorias, meses))
+            with open(ARQUIVO_LOTACAO, 'wb') as f:
+                f.write(gerar_lotacao(turmas))
+
+            rss_inicial = rss_atual()
+            cpu_inicial = tempo_cpu()
+            monitor = MonitorMemoria()
+            monitor.start()
+
+            simuladas = [SessaoSimulada(i, roteiro, interacoes, upload_lotacao, timeout) for i in range(sessoes)]
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=sessoes) as executor:
+                resultados = list(executor.map(lambda s: s.executar(), simuladas))
+            duracao = time.perf_counter() - inicio
+            cpu_total = tempo_cpu() - cpu_inicial
+
+            monitor.parar()
+        finally:
+            os.chdir(diretorio_original)
+
+    medicoes = pd.DataFrame([m for resultado in resultados for m in resultado])
+    consumo = {
+        'cpu_total_s': cpu_total,
+        'cpu_media_por_sessao_s': cpu_total / sessoes,
+        'rss_inicial_mb': rss_inicial / 2**20,
+        'rss_pico_mb': monitor.pico / 2**20,
+        'rss_medio_por_sessao_mb': (monitor.pico - rss_inicial) / 2**20 / sessoes,
+        'duracao_s': duracao,
+        'reruns_por_segundo': len(medicoes) / duracao
+    }
+    return medicoes, consumo
+
+
+def resumir(medicoes):
+    """Percentis de latência dos reruns por interação, com o tipo de rerun no servidor real"""
+    latencias = medicoes.groupby('acao')['latencia_s'].describe(percentiles=[0.5, 0.9, 0.99])
+    latencias = latencias[['count', '50%', '90%', '99%', 'max']].rename(
+        columns={'count': 'reruns', '50%': 'p50_s', '90%': 'p90_s', '99%': 'p99_s', 'max': 'max_s'}
+    )
+    latencias['no_servidor'] = [
+        'fragmento (medido: script inteiro)' if acao in INTERACOES_FRAGMENTO else 'script inteiro'
+        for acao in latencias.index
+    ]
+    return latencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessoes', type=int, default=5, help='sessões simultâneas')
+    parser.add_argument('--interacoes', type=int, default=10, help='interações por sessão')
+    parser.add_argument('--categorias', type=int, default=40, help='categorias no fluxo de caixa')
+    parser.add_argument('--meses', type=int, default=12, choices=range(1, 13), metavar='1-12')
+    parser.add_argument('--turmas', type=int, default=50, help='turmas na planilha de lotação')
+    parser.add_argument('--timeout', type=float, default=120, help='tempo máximo de um rerun (s)')
+    parser.add_argument('--json', help='grava as medições e o resumo neste arquivo')
+    args = parser.parse_args()
+
+    medicoes, consumo = executar_teste(
+        args.sessoes, args.interacoes, args.categorias, args.meses, args.turmas, timeout=args.timeout
+    )
+    latencias = resumir(medicoes)
+
+    print(f"\n{args.sessoes} sessões × {args.interacoes} interações "
+          f"({args.categorias} categorias, {args.meses} meses, {args.turmas} turmas)\n")
+    print("Latência dos reruns (s):")
+    print(latencias.round(3).to_string())
+    print("\nAs interações de fragmento são medidas como rerun completo (limite do AppTest): "
+          "a latência delas no servidor real é menor.")
+    print(f"\nCPU do processo: {consumo['cpu_total_s']:.1f}s no total, "
+          f"média de ~{consumo['cpu_media_por_sessao_s']:.2f}s por sessão (total ÷ sessões)")
+    print(f"RSS do processo: inicial {consumo['rss_inicial_mb']:.0f} MB, pico {consumo['rss_pico_mb']:.0f} MB, "
+          f"média de ~{consumo['rss_medio_por_sessao_mb']:.1f} MB por sessão (aumento ÷ sessões)")
+    print("As sessões compartilham um único runtime do Streamlit; não equivale a conexões a um servidor.")
+    print(f"Vazão: {consumo['reruns_por_segundo']:.2f} reruns/s em {consumo['duracao_s']:.1f}s")
+
+    erros = int(medicoes['erros'].sum())
+    if erros:
+        print(f"\n⚠️  {erros} reruns terminaram com exceção")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'parametros': vars(args),
+                'consumo': consumo,
+                'latencias': latencias.reset_index().to_dict(orient='records'),
+                'medicoes': medicoes.to_dict(orient='records')
+            }, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
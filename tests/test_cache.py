@@ -0,0 +1,110 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import cache as modulo_cache
+from utils.cache import GerenciadorCache, _chave
+
+
+class Relogio:
+    """Substitui o perf_counter: o custo de cada cálculo é o quanto ele avança o relógio"""
+
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(modulo_cache.time, 'perf_counter', relogio)
+    return relogio
+
+
+def _obter(cache, relogio, chave, tamanho, custo=1.0):
+    def calcular():
+        relogio.agora += custo
+        return np.zeros(tamanho, dtype=np.uint8)
+    return cache.obter(chave, calcular)
+
+
+def test_orcamento_nunca_e_ultrapassado(relogio):
+    cache = GerenciadorCache(1000)
+    for chave in 'abcd':
+        _obter(cache, relogio, chave, 400)
+
+    metricas = cache.metricas()
+    assert metricas['bytes_em_uso'] == 800
+    assert metricas['entradas'] == 2
+    assert metricas['descartes'] == 2
+
+
+def test_valor_maior_que_o_orcamento_e_recusado_mas_devolvido(relogio):
+    cache = GerenciadorCache(1000)
+    valor = _obter(cache, relogio, 'grande', 2000)
+
+    assert len(valor) == 2000
+    assert cache.metricas()['recusados'] == 1
+    assert cache.metricas()['entradas'] == 0
+
+
+def test_descarta_primeiro_o_mais_barato_de_recalcular(relogio):
+    cache = GerenciadorCache(200)
+    _obter(cache, relogio, 'cara', 100, custo=10.0)
+    _obter(cache, relogio, 'barata', 100, custo=1.0)
+    _obter(cache, relogio, 'nova', 100, custo=5.0)
+
+    assert set(cache._entradas) == {'cara', 'nova'}
+
+
+def test_acerto_renova_a_entrada_depois_do_envelhecimento(relogio):
+    cache = GerenciadorCache(300)
+    for chave in 'abc':
+        _obter(cache, relogio, chave, 100)
+    # Empate: sai a mais antiga e a inflação passa a valer a prioridade dela
+    _obter(cache, relogio, 'd', 100)
+    assert set(cache._entradas) == {'b', 'c', 'd'}
+
+    _obter(cache, relogio, 'b', 100)
+    _obter(cache, relogio, 'e', 100)
+    assert set(cache._entradas) == {'b', 'd', 'e'}
+
+
+def test_metricas_de_acertos_e_falhas(relogio):
+    cache = GerenciadorCache(1000)
+    _obter(cache, relogio, 'a', 10)
+    _obter(cache, relogio, 'a', 10)
+    _obter(cache, relogio, 'a', 10)
+    _obter(cache, relogio, 'b', 20)
+
+    metricas = cache.metricas()
+    assert (metricas['acertos'], metricas['falhas']) == (2, 2)
+    assert metricas['taxa_acerto'] == pytest.approx(0.5)
+    assert metricas['bytes_em_uso'] == 30
+
+
+def test_calculo_que_falha_nao_deixa_trava_da_chave(relogio):
+    cache = GerenciadorCache(1000)
+
+    def falhar():
+        raise RuntimeError('planilha ilegível')
+
+    with pytest.raises(RuntimeError):
+        cache.obter('versao-1', falhar)
+    assert cache._calculando == {}
+
+    assert len(_obter(cache, relogio, 'versao-1', 10)) == 10
+    assert cache._calculando == {}
+
+
+def test_chave_de_dataframe_e_pelo_conteudo():
+    df = pd.DataFrame({'Mes': ['Janeiro', 'Fevereiro'], 'Valor': [1.0, 2.0]})
+
+    assert _chave(df) == _chave(df.copy())
+    assert _chave(df) != _chave(df.assign(Valor=[1.0, 3.0]))
@@ -0,0 +1,120 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lancamentos import AgregadorLancamentos
+
+
+def _lancamentos(n, inicio=0):
+    return pd.DataFrame({
+        'Data': [f"{(inicio + i) % 28 + 1:02d}/01/2025" for i in range(n)],
+        'Conta': ['1.01'] * n,
+        'Valor': [10.0] * n
+    })
+
+
+def _total(agregador):
+    return agregador.cubo.sum()
+
+
+def test_csv_pequeno_estendido_processa_so_as_linhas_novas(tmp_path):
+    caminho = tmp_path / 'extrato.csv'
+    _lancamentos(3).to_csv(caminho, sep=';', index=False, decimal=',')
+
+    agregador = AgregadorLancamentos(str(tmp_path / 'cubo.parquet'))
+    assert agregador.ingerir(str(caminho)) == 3
+
+    with open(caminho, 'a', encoding='utf-8') as f:
+        f.write('04/01/2025;1.01;10,0\n')
+
+    retomado = AgregadorLancamentos(str(tmp_path / 'cubo.parquet'))
+    assert retomado.ingerir(str(caminho)) == 1
+    assert _total(retomado) == pytest.approx(40.0)
+
+
+def test_csv_trocado_e_recusado(tmp_path):
+    caminho = tmp_path / 'extrato.csv'
+    _lancamentos(3).to_csv(caminho, sep=';', index=False)
+    agregador = AgregadorLancamentos(str(tmp_path / 'cubo.parquet'))
+    agregador.ingerir(str(caminho))
+
+    _lancamentos(4, inicio=5).to_csv(caminho, sep=';', index=False)
+    with pytest.raises(ValueError, match='substituído'):
+        agregador.ingerir(str(caminho))
+
+
+def test_xlsx_regravado_com_linhas_novas_processa_so_as_novas(tmp_path):
+    caminho = tmp_path / 'erp.xlsx'
+    _lancamentos(3).to_excel(caminho, index=False)
+
+    agregador = AgregadorLancamentos(str(tmp_path / 'cubo.parquet'))
+    assert agregador.ingerir(str(caminho)) == 3
+
+    _lancamentos(5).to_excel(caminho, index=False)
+    retomado = AgregadorLancamentos(str(tmp_path / 'cubo.parquet'))
+    assert retomado.ingerir(str(caminho)) == 2
+    assert _total(retomado) == pytest.approx(50.0)
+
+
+def test_xlsx_trocado_e_recusado(tmp_path):
+    caminho = tmp_path / 'erp.xlsx'
+    _lancamentos(3).to_excel(caminho, index=False)
+    agregador = AgregadorLancamentos(str(tmp_path / 'cubo.parquet'))
+    agregador.ingerir(str(caminho))
+
+    _lancamentos(4, inicio=5).to_excel(caminho, index=False)
+    with pytest.raises(ValueError, match='substituído'):
+        agregador.ingerir(str(caminho))
+
+
+def test_datas_em_formatos_misturados_no_mesmo_bloco(tmp_path):
+    caminho = tmp_path / 'extrato.csv'
+    caminho.write_text('Data;Conta;Valor\n2025-01-15;1.01;10\n15/02/2025;1.01;20\n03/03/2025;1.01;30\n', encoding='utf-8')
+
+    agregador = AgregadorLancamentos(str(tmp_path / 'cubo.parquet'))
+    assert agregador.ingerir(str(caminho)) == 3
+    assert agregador.cubo.xs(2025, level='Ano').droplevel('Código').to_dict() == {1: 10.0, 2: 20.0, 3: 30.0}
+
+
+def test_linha_invalida_recusa_o_bloco_sem_avancar_o_progresso(tmp_path):
+    caminho = tmp_path / 'extrato.csv'
+    caminho.write_text('Data;Conta;Valor\n15/01/2025;1.01;10\n32/13/2025;1.01;20\n', encoding='utf-8')
+
+    agregador = AgregadorLancamentos(str(tmp_path / 'cubo.parquet'))
+    with pytest.raises(ValueError, match='linhas 3'):
+        agregador.ingerir(str(caminho))
+    assert os.path.abspath(caminho) not in agregador.estado['arquivos']
+
+    caminho.write_text('Data;Conta;Valor\n15/01/2025;1.01;10\n12/03/2025;1.01;20\n', encoding='utf-8')
+    assert agregador.ingerir(str(caminho)) == 2
+    assert _total(agregador) == pytest.approx(30.0)
+
+
+def test_valores_com_separador_de_milhar(tmp_path):
+    caminho = tmp_path / 'extrato.csv'
+    caminho.write_text('Data;Conta;Valor\n15/01/2025;1.01;1.500\n15/01/2025;1.01;"1.234,56"\n15/01/2025;1.01;2.5\n', encoding='utf-8')
+
+    agregador = AgregadorLancamentos(str(tmp_path / 'cubo.parquet'))
+    agregador.ingerir(str(caminho))
+    assert _total(agregador) == pytest.approx(1500 + 1234.56 + 2.5)
+
+
+def test_xlsx_corrompido_vira_value_error(tmp_path):
+    caminho = tmp_path / 'erp.xlsx'
+    caminho.write_bytes(b'isto nao e um zip')
+
+    agregador = AgregadorLancamentos(str(tmp_path / 'cubo.parquet'))
+    with pytest.raises(ValueError, match='não pôde ser lido'):
+        agregador.ingerir(str(caminho))
+
+
+def test_csv_de_uma_coluna_vira_value_error(tmp_path):
+    caminho = tmp_path / 'extrato.csv'
+    caminho.write_text('Data\n15/01/2025\n', encoding='utf-8')
+
+    agregador = AgregadorLancamentos(str(tmp_path / 'cubo.parquet'))
+    with pytest.raises(ValueError, match='não pôde ser lido'):
+        agregador.ingerir(str(caminho))
@@ -0,0 +1,175 @@
+import os
+import sys
+import time
+import hashlib
+import functools
+import threading
+import numpy as np
+import pandas as pd
+
+# Orçamento padrão de memória do cache, em MB (sobrescrito por DASHBOARD_CACHE_MB)
+ORCAMENTO_PADRAO_MB = 512
+
+
+def tamanho_em_bytes(valor, _vistos=None):
+    """Estima a memória ocupada por um valor cacheado
+
+    DataFrames usam `memory_usage(deep=True)`, figuras Plotly o tamanho do JSON
+    e arrays o `nbytes`; contêineres e objetos são percorridos recursivamente.
+    """
+    vistos = _vistos if _vistos is not None else set()
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, (pd.Series, pd.Index)):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if hasattr(valor, 'to_plotly_json'):
+        return len(valor.to_json())
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(
+            tamanho_em_bytes(k, vistos) + tamanho_em_bytes(v, vistos) for k, v in valor.items()
+        )
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return sys.getsizeof(valor) + sum(tamanho_em_bytes(v, vistos) for v in valor)
+    if hasattr(valor, '__dict__'):
+        return sys.getsizeof(valor) + tamanho_em_bytes(vars(valor), vistos)
+    return sys.getsizeof(valor)
+
+
+def _chave(valor):
+    """Representação estável e hashável de um argumento (DataFrames pelo conteúdo)"""
+    if isinstance(valor, pd.DataFrame):
+        conteudo = pd.util.hash_pandas_object(valor, index=True).to_numpy().tobytes()
+        colunas = repr(list(valor.columns)).encode('utf-8')
+        return ('DataFrame', hashlib.sha1(conteudo + colunas).hexdigest())
+    if isinstance(valor, np.ndarray):
+        return ('ndarray', valor.dtype.str, valor.shape, hashlib.sha1(valor.tobytes()).hexdigest())
+    if isinstance(valor, (list, tuple)):
+        return tuple(_chave(v) for v in valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _chave(v)) for k, v in valor.items()))
+    return valor
+
+
+class GerenciadorCache:
+    """Cache único do processo, com orçamento de memória e descarte ponderado pelo custo
+
+    O descarte segue o GreedyDual-Size: cada entrada recebe a prioridade
+    `L + tempo_de_recalculo / tamanho`, renovada a cada acerto. Sai primeiro a de
+    menor prioridade, e `L` passa a valer essa prioridade, o que envelhece as
+    entradas não usadas (comportamento de LRU ponderado pelo custo de recalcular).
+    """
+
+    def __init__(self, orcamento_bytes):
+        self.orcamento_bytes = orcamento_bytes
+        self._entradas = {}
+        self._calculando = {}
+        self._trava = threading.Lock()
+        self._inflacao = 0.0
+        self.bytes_em_uso = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+        self.recusados = 0
+
+    def obter(self, chave, calcular):
+        """Retorna o valor da chave, calculando-o (uma única vez por chave) se necessário"""
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                self.acertos += 1
+                entrada['prioridade'] = self._inflacao + entrada['custo'] / entrada['tamanho']
+                return entrada['valor']
+            trava_chave = self._calculando.setdefault(chave, threading.Lock())
+
+        # Sessões concorrentes que pedem a mesma chave esperam um único cálculo
+        with trava_chave:
+            with self._trava:
+                entrada = self._entradas.get(chave)
+                if entrada is not None:
+                    self.acertos += 1
+                    return entrada['valor']
+                self.falhas += 1
+
+            try:
+                inicio = time.perf_counter()
+                valor = calcular()
+                custo = time.perf_counter() - inicio
+                tamanho = max(tamanho_em_bytes(valor), 1)
+                with self._trava:
+                    self._inserir(chave, valor, custo, tamanho)
+            finally:
+                # Também quando o cálculo falha: a chave inclui a versão dos dados e não voltaria a ser usada
+                with self._trava:
+                    if self._calculando.get(chave) is trava_chave:
+                        del self._calculando[chave]
+        return valor
+
+    def _inserir(self, chave, valor, custo, tamanho):
+        if tamanho > self.orcamento_bytes:
+            self.recusados += 1
+            return
+
+        while self._entradas and self.bytes_em_uso + tamanho > self.orcamento_bytes:
+            vitima = min(self._entradas, key=lambda c: self._entradas[c]['prioridade'])
+            descartada = self._entradas.pop(vitima)
+            self._inflacao = descartada['prioridade']
+            self.bytes_em_uso -= descartada['tamanho']
+            self.descartes += 1
+
+        self._entradas[chave] = {
+            'valor': valor,
+            'custo': custo,
+            'tamanho': tamanho,
+            'prioridade': self._inflacao + custo / tamanho
+        }
+        self.bytes_em_uso += tamanho
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+            self.bytes_em_uso = 0
+
+    def metricas(self):
+        """Métricas de uso: taxa de acerto, memória, descartes"""
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                'entradas': len(self._entradas),
+                'bytes_em_uso': self.bytes_em_uso,
+                'orcamento_bytes': self.orcamento_bytes,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'descartes': self.descartes,
+                'recusados': self.recusados
+            }
+
+
+CACHE = GerenciadorCache(int(float(os.environ.get('DASHBOARD_CACHE_MB', ORCAMENTO_PADRAO_MB)) * 1024 * 1024))
+
+
+def cache_gerenciado(funcao):
+    """Decorador que guarda o resultado da função no cache do processo
+
+    Assim como no `st.cache_data`, argumentos cujo nome começa com "_" não entram
+    na chave. O valor devolvido é compartilhado entre sessões e não deve ser alterado.
+    """
+    nomes = funcao.__code__.co_varnames[:funcao.__code__.co_argcount]
+    padroes = funcao.__defaults__ or ()
+    padroes = dict(zip(nomes[len(nomes) - len(padroes):], padroes))
+
+    @functools.wraps(funcao)
+    def envoltorio(*args, **kwargs):
+        argumentos = {**padroes, **dict(zip(nomes, args)), **kwargs}
+        chave = (funcao.__module__, funcao.__qualname__) + tuple(
+            (nome, _chave(valor)) for nome, valor in sorted(argumentos.items()) if not nome.startswith('_')
+        )
+        return CACHE.obter(chave, lambda: funcao(*args, **kwargs))
+
+    return envoltorio
@@ -0,0 +1,99 @@
+import os
+import time
+import threading
+import importlib
+import importlib.util
+import pandas as pd
+
+# Motores do pandas por formato, do preferido ao último recurso, e o módulo de cada um
+MOTORES = {
+    'xlsx': ['calamine', 'openpyxl'],
+    'xls': ['calamine', 'xlrd']
+}
+MODULOS = {
+    'calamine': 'python_calamine',
+    'openpyxl': 'openpyxl',
+    'xlrd': 'xlrd'
+}
+
+# Força um motor específico (ex.: DASHBOARD_MOTOR_EXCEL=openpyxl), pulando o benchmark
+VARIAVEL_MOTOR = 'DASHBOARD_MOTOR_EXCEL'
+
+# O benchmark lê só uma amostra de linhas, para não custar várias leituras completas
+LINHAS_AMOSTRA = 200
+
+_motor_escolhido = {}
+# Uma trava por formato: medir os motores de .xls não bloqueia leituras de .xlsx
+_travas = {formato: threading.Lock() for formato in MOTORES}
+
+
+def formato_excel(caminho):
+    """Identifica o formato pelo conteúdo ('xlsx' ou 'xls'), não pela extensão"""
+    with open(caminho, 'rb') as f:
+        assinatura = f.read(8)
+    if assinatura.startswith(b'PK\x03\x04'):
+        return 'xlsx'
+    if assinatura.startswith(b'\xd0\xcf\x11\xe0'):
+        return 'xls'
+    return 'xlsx' if str(caminho).lower().endswith(('.xlsx', '.xlsm')) else 'xls'
+
+
+def motores_disponiveis(formato):
+    """Motores instalados capazes de ler o formato, na ordem de preferência"""
+    return [m for m in MOTORES[formato] if importlib.util.find_spec(MODULOS[m]) is not None]
+
+
+def medir_motores(caminho, repeticoes=3, linhas=LINHAS_AMOSTRA, **kwargs):
+    """Tempo médio de leitura de uma amostra do arquivo com cada motor disponível
+
+    Motores que falham ficam de fora. A importação de cada motor acontece antes da
+    medição, para que o custo de carregar o módulo não entre no tempo.
+    """
+    kwargs['nrows'] = min(kwargs.get('nrows') or linhas, linhas)
+    tempos = {}
+    for motor in motores_disponiveis(formato_excel(caminho)):
+        try:
+            importlib.import_module(MODULOS[motor])
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                pd.read_excel(caminho, engine=motor, **kwargs)
+            tempos[motor] = (time.perf_counter() - inicio) / repeticoes
+        except Exception:
+            # Cada motor tem suas próprias exceções (CalamineError, XLRDError, BadZipFile...)
+            continue
+    return tempos
+
+
+def escolher_motor(caminho, **kwargs):
+    """Motor mais rápido para o formato do arquivo, medido uma vez por processo"""
+    formato = formato_excel(caminho)
+    forcado = os.environ.get(VARIAVEL_MOTOR)
+    if forcado and forcado in motores_disponiveis(formato):
+        return forcado
+
+    with _travas[formato]:
+        if formato not in _motor_escolhido:
+            tempos = medir_motores(caminho, **kwargs)
+            if not tempos:
+                # Nenhum motor leu este arquivo: mede de novo com o próximo, sem fixar a escolha
+                return None
+            _motor_escolhido[formato] = min(tempos, key=tempos.get)
+        return _motor_escolhido[formato]
+
+
+def ler_excel(caminho, **kwargs):
+    """`pd.read_excel` com o motor mais rápido disponível e recuo para os demais em caso de falha
+
+    Aceita os mesmos argumentos do `pd.read_excel`; passe `usecols` para ler só as
+    colunas necessárias.
+    """
+    escolhido = escolher_motor(caminho, **kwargs)
+    candidatos = [escolhido] + [m for m in motores_disponiveis(formato_excel(caminho)) if m != escolhido]
+
+    erro = None
+    for motor in candidatos:
+        try:
+            return pd.read_excel(caminho, engine=motor, **kwargs)
+        except Exception as e:
+            erro = e
+    raise erro
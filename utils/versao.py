@@ -0,0 +1,17 @@
+import os
+import hashlib
+
+
+def versao_arquivo(caminho):
+    """Identificador da versão de um arquivo de dados, derivado da data de modificação e do tamanho
+
+    Não lê o conteúdo do arquivo, então pode ser chamado a cada rerun ou requisição.
+    """
+    info = os.stat(caminho)
+    return f"{info.st_mtime_ns:x}-{info.st_size:x}"
+
+
+def versao_combinada(*versoes):
+    """Combina várias versões (de arquivos ou parâmetros) em um identificador curto"""
+    chave = "|".join(str(v) for v in versoes)
+    return hashlib.sha1(chave.encode('utf-8')).hexdigest()[:16]